@@ -0,0 +1,184 @@
+"""Benchmarks the pet simulation (animations, state machine and physics) without a display.
+
+Run from the project's root folder with `python -m benchmarks.bench_pets`, see `--help` for the options.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# The benchmarks load the sprites relative to the project's root folder
+os.chdir(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from src.animation import Animation, AnimationStates, Animator, get_animations
+from src.pets import NullBackend, Pet, Scheduler
+
+
+def create_pets(
+    pet_name: str,
+    count: int,
+    target_resolution: Tuple[int, int],
+    screen: Dict[str, int],
+    seed: int = None,
+) -> List[Pet]:
+    """Create pets that draw to a `NullBackend`, spread out along the bottom of the screen
+
+    Args:
+        pet_name (str): name of the pet, ie "horse"
+        count (int): how many pets to create
+        target_resolution (Tuple[int, int]): size of the pets
+        screen (Dict[str, int]): size of the screen, with "width" and "height" keys
+        seed (int, optional): seed of the first pet's random transitions, the next pet gets seed + 1 and so on.
+        Defaults to None, random transitions.
+
+    Returns:
+        List[Pet]
+    """
+    # Frames stay as Pillow images, no tkinter needed
+    Animation.frame_factory = lambda image: image
+    animations = get_animations(pet_name, target_resolution, False)
+    pets = []
+    for i in range(count):
+        animator = Animator(
+            state=AnimationStates.IDLE,
+            frame_number=0,
+            animations=animations,
+            seed=seed + i if seed is not None else None,
+        )
+        x = int(screen["width"] * (i + 1) / (count + 1))
+        pets.append(Pet(x, screen["height"], NullBackend(screen), animator))
+    return pets
+
+
+def count_transitions(pet: Pet, transitions: Counter):
+    """Count every state change of a pet's animator into transitions"""
+    animator = pet.animator
+    set_animation_state = animator.set_animation_state
+
+    def counting_set_animation_state(state: AnimationStates) -> bool:
+        previous = animator.state
+        changed = set_animation_state(state)
+        if changed:
+            transitions[(previous, state)] += 1
+        return changed
+
+    animator.set_animation_state = counting_set_animation_state
+
+
+def run(
+    pet_name: str,
+    count: int,
+    ticks: int,
+    physics_step: float = 10,
+    target_resolution: Tuple[int, int] = (100, 100),
+    seed: int = 0,
+    batch_physics: bool = False,
+) -> dict:
+    """Run count pets for a number of ticks, where every tick is one physics step and one render
+
+    Args:
+        pet_name (str): name of the pet, ie "horse"
+        count (int): how many pets to run
+        ticks (int): how many ticks to run for
+        physics_step (float, optional): ms of time per tick. Defaults to 10.
+        target_resolution (Tuple[int, int], optional): size of the pets. Defaults to (100, 100).
+        seed (int, optional): seed for the random transitions. Defaults to 0.
+        batch_physics (bool, optional): move the pets with a PhysicsWorld. Defaults to False.
+
+    Returns:
+        dict: the measurements
+    """
+    screen = {"width": 1920, "height": 1080}
+    pets = create_pets(pet_name, count, target_resolution, screen, seed)
+    transitions = Counter()
+    for pet in pets:
+        count_transitions(pet, transitions)
+    scheduler = Scheduler(physics_step=physics_step, batch_physics=batch_physics)
+    for pet in pets:
+        scheduler.add_pet(pet)
+
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        scheduler.tick(physics_step)
+    duration = time.perf_counter() - start
+    blocks_after = sys.getallocatedblocks()
+
+    return {
+        "pet": pet_name,
+        "pets": count,
+        "batch_physics": scheduler.physics is not None,
+        "ticks": ticks,
+        "seconds": duration,
+        "ticks_per_second": ticks / duration,
+        "pet_updates_per_second": ticks * count / duration,
+        "allocated_blocks_per_tick": (blocks_after - blocks_before) / ticks,
+        "geometry_calls": sum(pet.canvas.geometry_calls for pet in pets),
+        "frame_calls": sum(pet.canvas.frame_calls for pet in pets),
+        "suppressed_geometry_calls": sum(
+            pet.canvas.suppressed_geometry_calls for pet in pets
+        ),
+        "suppressed_frame_calls": sum(
+            pet.canvas.suppressed_frame_calls for pet in pets
+        ),
+        "transitions": transitions,
+    }
+
+
+def report(result: dict):
+    """Print the measurements of a run"""
+    print(
+        f"{result['pet']} x{result['pets']}{' (batch physics)' if result['batch_physics'] else ''}: {result['ticks']} ticks in {result['seconds']:.3f}s, "
+        f"{result['ticks_per_second']:.0f} ticks/s, {result['pet_updates_per_second']:.0f} pet updates/s, "
+        f"{result['allocated_blocks_per_tick']:.2f} allocated blocks/tick"
+    )
+    print(
+        f"    {result['geometry_calls']} geometry calls ({result['suppressed_geometry_calls']} suppressed), "
+        f"{result['frame_calls']} frame calls ({result['suppressed_frame_calls']} suppressed), "
+        f"{sum(result['transitions'].values())} state transitions"
+    )
+    for (previous, state), times in result["transitions"].most_common():
+        print(f"    {previous.name} -> {state.name}: {times}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pet simulation without a display"
+    )
+    parser.add_argument("--pet", default="horse", help="pet to simulate")
+    parser.add_argument(
+        "--pets",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100],
+        help="how many pets to run, one run per value",
+    )
+    parser.add_argument("--ticks", type=int, default=10000, help="ticks per run")
+    parser.add_argument(
+        "--physics-step", type=float, default=10, help="ms of time per tick"
+    )
+    parser.add_argument(
+        "--resolution", type=int, default=100, help="width and height of the pets"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--batch-physics",
+        action="store_true",
+        help="move the pets with numpy arrays, needs numpy",
+    )
+    args = parser.parse_args()
+
+    for count in args.pets:
+        report(
+            run(
+                args.pet,
+                count,
+                args.ticks,
+                physics_step=args.physics_step,
+                target_resolution=(args.resolution, args.resolution),
+                seed=args.seed,
+                batch_physics=args.batch_physics,
+            )
+        )
@@ -1,6 +1,13 @@
+import time
+
+started = time.perf_counter()
 from src.main import start_program
+from src.startup import StartupReport
+import argparse
 import os
-import sys
+
+startup = StartupReport(started)
+startup.mark("imports")
 
 # Update the current working directory to always work with relative imports
 # regardless of where the script was called
@@ -9,10 +16,49 @@ os.chdir(os.path.dirname(os.path.realpath(__file__)))
 # see if command line arguments are present
 # and if the args are valid,
 # make the pet and display it!
-if len(sys.argv) == 2:
-    # This will be used to allow user to make a specific pet regardless of the default pet
-    start_program(sys.argv[1])
-elif len(sys.argv) > 2:
-    raise Exception(f"Expected 0 or 1 positional arguments, not {len(sys.argv) - 1}")
+parser = argparse.ArgumentParser(description="Show desktop pets")
+# This will be used to allow user to make a specific pet regardless of the default pet
+parser.add_argument(
+    "pet", nargs="?", default=None, help="pet to show, defaults to the config's pet"
+)
+parser.add_argument(
+    "-n",
+    "--count",
+    type=int,
+    default=None,
+    help="how many pets to show, defaults to the config's pet_count",
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="profile the program with cProfile, the stats are written to profile.prof when it exits",
+)
+parser.add_argument(
+    "--startup-report",
+    action="store_true",
+    help="print how long each phase of starting up took once the first frame is shown, then exit",
+)
+args = parser.parse_args()
+if args.profile:
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(
+            start_program,
+            args.pet,
+            pet_count=args.count,
+            startup=startup,
+            report_startup=args.startup_report,
+        )
+    finally:
+        profiler.dump_stats("profile.prof")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
 else:
-    start_program()
+    start_program(
+        args.pet,
+        pet_count=args.count,
+        startup=startup,
+        report_startup=args.startup_report,
+    )
@@ -1,8 +1,19 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import subprocess
 import sys
 
 block_cipher = None
 
+# Pack every pet into a sprite atlas so the build loads each pet with a single read
+pets = [
+    pet for pet in os.listdir(os.path.join('src', 'sprites'))
+    if os.path.isdir(os.path.join('src', 'sprites', pet))
+]
+subprocess.run([sys.executable, '-m', 'src.animation', 'pack', *pets], check=True)
+# The build unpacks the sprites somewhere else, make sure the atlases are still used from there
+subprocess.run([sys.executable, '-m', 'src.animation', 'check', *pets], check=True)
+
 
 a = Analysis(['run.py'],
              pathex=['C:\\Users\\willw\\Documents\\GitHub\\Personal\\desktop-pet'],
@@ -1,11 +1,28 @@
 # For the module to work
+import atexit
 import logging
+import logging.handlers
+import queue
 
-logging.basicConfig(format="%(name)s - %(levelname)s: %(message)s", level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-f_handler = logging.FileHandler("logs.log")
+# Handlers run on a background thread, so logging never makes the tkinter loop wait for the console
+# or the disk. Records are only formatted and queued on the thread that logs them
+log_queue = queue.SimpleQueue()
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(logging.Formatter("%(name)s - %(levelname)s: %(message)s"))
+# The log file is only created once there is an error to write to it
+f_handler = logging.FileHandler("logs.log", delay=True)
 f_handler.setLevel(logging.ERROR)
 f_format = logging.Formatter("%(asctime)s: %(name)s - %(levelname)s: %(message)s")
 f_handler.setFormatter(f_format)
-logger.addHandler(f_handler)
+log_listener = logging.handlers.QueueListener(
+    log_queue, console_handler, f_handler, respect_handler_level=True
+)
+queue_handler = logging.handlers.QueueHandler(log_queue)
+# Only the message is formatted when queued, the handlers add the rest
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener.start()
+# Write whatever is still queued before the program exits
+atexit.register(log_listener.stop)
+
+logger = logging.getLogger(__name__)
@@ -2,3 +2,7 @@ from .animation import Animation
 from .animator import Animator
 from .animation_states import AnimationStates
 from .load_animations import get_animations
+from .loader import load_animations
+from .frame_residency import FrameResidency
+from .frame_store import FrameStore
+from .pet_definition import PetDefinition, load_pet_definition, list_pets
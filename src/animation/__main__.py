@@ -0,0 +1,97 @@
+"""Build time tools for the animations, run with `python -m src.animation {command}`"""
+
+import argparse
+from .preprocessing import preprocess_directory
+
+parser = argparse.ArgumentParser(prog="python -m src.animation")
+commands = parser.add_subparsers(dest="command", required=True)
+
+preprocess = commands.add_parser(
+    "preprocess",
+    help="remove partial transparency from every png in a sprite folder",
+)
+preprocess.add_argument("source", help="folder with the sprites, ie src/sprites/horse")
+preprocess.add_argument("destination", help="folder to write the processed sprites to")
+preprocess.add_argument(
+    "--force", action="store_true", help="process files that are already up to date"
+)
+
+pack = commands.add_parser(
+    "pack",
+    help="pack every frame of a pet into a sprite atlas in its sprite folder, using the settings in config.xml",
+)
+pack.add_argument("pets", nargs="+", help="names of the pets to pack, ie horse")
+pack.add_argument(
+    "--resolution",
+    type=int,
+    nargs=2,
+    metavar=("X", "Y"),
+    help="resolution to pack the frames at, defaults to the pet's resolution in config.xml",
+)
+
+check = commands.add_parser(
+    "check",
+    help="check that the packed sprite atlases of pets are used, also once their sprite folder is copied",
+)
+check.add_argument("pets", nargs="+", help="names of the pets to check, ie horse")
+
+analyze = commands.add_parser(
+    "analyze",
+    help="predict how much time a pet spends in each state and what updating it costs",
+)
+analyze.add_argument("pet", help="name of the pet to analyze, ie horse")
+
+args = parser.parse_args()
+if args.command == "preprocess":
+    preprocess_directory(args.source, args.destination, force=args.force)
+elif args.command == "pack":
+    from src.config_reader import load_config
+    from .load_animations import pack_sprite_atlas
+
+    config = load_config()
+    for pet in args.pets:
+        target_resolution = (
+            tuple(args.resolution)
+            if args.resolution is not None
+            else config.pet(pet).target_resolution
+        )
+        pack_sprite_atlas(
+            pet,
+            target_resolution,
+            config.should_run_preprocessing,
+            config.resampling,
+        )
+elif args.command == "check":
+    from .load_animations import check_sprite_atlas
+
+    for pet in args.pets:
+        check_sprite_atlas(pet)
+elif args.command == "analyze":
+    from src.config_reader import load_config
+    from .analysis import analyze_animations, expected_load
+    from .animation import Animation
+    from .load_animations import get_animations
+
+    # Only the number of frames and their timings matter, so never make tkinter images
+    Animation.frame_factory = lambda frame: frame
+    config = load_config()
+    animations = get_animations(
+        args.pet,
+        config.pet(args.pet).target_resolution,
+        config.should_run_preprocessing,
+        resampling=config.resampling,
+    )
+    statistics = analyze_animations(animations)
+    print(
+        f"{'state':<16}{'visits':>8}{'time':>8}{'dwell (s)':>11}{'ticks/s':>9}{'frames/s':>10}"
+    )
+    for stats in sorted(statistics.values(), key=lambda s: -s.time_share):
+        print(
+            f"{stats.state.name:<16}{stats.visit_share:>8.1%}{stats.time_share:>8.1%}"
+            f"{stats.dwell / 1000:>11.2f}{stats.ticks_per_second:>9.1f}{stats.frames_per_second:>10.1f}"
+        )
+    load = expected_load(statistics)
+    print(
+        f"On average {load['ticks_per_second']:.1f} ticks/s, {load['frames_per_second']:.1f} frame changes/s "
+        f"and {load['moves_per_second']:.1f} window moves/s, moving {load['moving_share']:.0%} of the time"
+    )
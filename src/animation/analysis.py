@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from typing import Dict, List
+from .animation import Animation
+from .animation_states import AnimationStates
+
+
+@dataclass(frozen=True)
+class StateStatistics:
+    """What a pet is expected to do in one of its states in the long run"""
+
+    state: AnimationStates
+    visit_share: float
+    """Fraction of the states the pet enters that are this state"""
+    time_share: float
+    """Fraction of the time the pet spends in this state"""
+    dwell: float
+    """Expected ms the pet stays in this state once it enters it, including repititions and picking it again"""
+    ticks_per_second: float
+    """Updates of the pet per second while in this state"""
+    frames_per_second: float
+    """Frame changes (redraws) per second while in this state"""
+    moving: bool
+    """Whether or not the window moves (is redrawn on every tick) while in this state"""
+
+
+def reachable_states(
+    animations: Dict[AnimationStates, Animation], start: AnimationStates
+) -> List[AnimationStates]:
+    """States the pet can get to from the start state by itself, ie without being grabbed
+
+    Args:
+        animations (Dict[AnimationStates, Animation]): animations of the pet
+        start (AnimationStates): state the pet starts in
+
+    Returns:
+        List[AnimationStates]: the reachable states, in the order they were found
+    """
+    found = [start]
+    for state in found:
+        for next_state in animations[state].next_animation_states:
+            if next_state not in found:
+                found.append(next_state)
+    return found
+
+
+def analyze_animations(
+    animations: Dict[AnimationStates, Animation],
+    start: AnimationStates = AnimationStates.IDLE,
+    tolerance: float = 1e-12,
+    max_iterations: int = 100000,
+) -> Dict[AnimationStates, StateStatistics]:
+    """Predict how a pet behaves in the long run from its transition graph: how often it enters each state,
+    how much of its time it spends there and how many updates and redraws that costs.
+
+    The states the pet enters form a markov chain, its stationary distribution is found by power
+    iteration. Every time a state is entered it plays (repititions + 1) times, so the share of time
+    spent in a state is its share of the visits weighted by that time. The animations need to be
+    loaded, as how long they play for depends on their frames.
+
+    Args:
+        animations (Dict[AnimationStates, Animation]): loaded animations of the pet
+        start (AnimationStates, optional): state the pet starts in. Defaults to AnimationStates.IDLE.
+        tolerance (float, optional): stop iterating once no probability changes by more than this. Defaults to 1e-12.
+        max_iterations (int, optional): most power iterations to do. Defaults to 100000.
+
+    Returns:
+        Dict[AnimationStates, StateStatistics]: statistics of every state that can be reached from start
+    """
+    states = reachable_states(animations, start)
+    index = {state: i for i, state in enumerate(states)}
+    probabilities = [animations[state].transitions.probabilities() for state in states]
+
+    # Half of the chance to stay put makes the chain aperiodic, which does not change its
+    # stationary distribution but does make power iteration converge
+    distribution = [1.0 / len(states)] * len(states)
+    for _ in range(max_iterations):
+        updated = [0.5 * p for p in distribution]
+        for i, state_probabilities in enumerate(probabilities):
+            for next_state, p in state_probabilities.items():
+                updated[index[next_state]] += 0.5 * distribution[i] * p
+        change = max(abs(a - b) for a, b in zip(updated, distribution))
+        distribution = updated
+        if change < tolerance:
+            break
+
+    visit_times = [
+        animations[state].duration * (animations[state].repititions + 1)
+        for state in states
+    ]
+    total_time = sum(p * t for p, t in zip(distribution, visit_times))
+    statistics = {}
+    for i, state in enumerate(states):
+        animation = animations[state]
+        stay = probabilities[i].get(state, 0)
+        statistics[state] = StateStatistics(
+            state=state,
+            visit_share=distribution[i],
+            time_share=distribution[i] * visit_times[i] / total_time,
+            dwell=visit_times[i] / (1 - stay) if stay < 1 else float("inf"),
+            ticks_per_second=1000 / animation.frame_timer,
+            frames_per_second=1000 * len(animation.frames) / animation.duration,
+            moving=animation.v_x != 0
+            or animation.v_y != 0
+            or animation.a_x != 0
+            or animation.a_y != 0,
+        )
+    return statistics
+
+
+def expected_load(
+    statistics: Dict[AnimationStates, StateStatistics]
+) -> Dict[str, float]:
+    """Average cost of a pet over the long run, see `analyze_animations`
+
+    Args:
+        statistics (Dict[AnimationStates, StateStatistics]): statistics of the pet's states
+
+    Returns:
+        Dict[str, float]: ticks, frame changes and window moves per second, and the fraction of the time the pet moves
+    """
+    load = {
+        "ticks_per_second": 0.0,
+        "frames_per_second": 0.0,
+        "moves_per_second": 0.0,
+        "moving_share": 0.0,
+    }
+    for stats in statistics.values():
+        load["ticks_per_second"] += stats.time_share * stats.ticks_per_second
+        load["frames_per_second"] += stats.time_share * stats.frames_per_second
+        if stats.moving:
+            load["moves_per_second"] += stats.time_share * stats.ticks_per_second
+            load["moving_share"] += stats.time_share
+    return load
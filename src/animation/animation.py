@@ -1,13 +1,19 @@
-import tkinter as tk
-import random
-from itertools import repeat
+import time
+from bisect import bisect_right
+from itertools import accumulate
 from os import listdir
 from os.path import isfile, join
-from typing import Tuple
+from typing import Any, Callable, Dict, Tuple, Union
 from typing import List
-from PIL import Image
+from PIL import Image, ImageSequence
 from src import logger
 from .animation_states import AnimationStates
+from .frame_cache import FrameCache
+from .frame_store import FrameStore
+from .preprocessing import remove_partial_transparency
+from .scaling import ScaledFrameCache, scale_frames
+from .sprite_atlas import SpriteAtlas
+from .transitions import TransitionTable
 
 
 class Animation:
@@ -18,13 +24,17 @@ class Animation:
 
     next_animation_states: List[AnimationStates]
     """possible animations for after this animation"""
+    transitions: TransitionTable
+    """how likely each of the next_animation_states is to follow this animation"""
     frames: list
-    """List of frames in the animation"""
+    """The frames of the animation in the order they are played, references to images in
+    `Animation.frame_store`"""
+    durations: List[int]
+    """How many ms each frame in frames is shown for"""
     frame_timer: int
-    """time in between every frame of the animation. Should be at most 100ms, otherwise time between
-    updates will be too long and will appear laggy. To achieve slower animation at 100ms (or less) user
-    frame_multiplier function in init method. (by default if frame_timer>100 then frame_multipler will
-    be applied automatically to keep same time between visual image changes (see __init__)"""
+    """time in between every update (tick) of the pet while this animation plays. This is at most
+    MAX_FRAME_TIMER, otherwise time between updates will be too long and will appear laggy. How long
+    each frame is shown for is kept separately in durations"""
     v_x: int
     v_y: int
     a_x: int
@@ -32,18 +42,55 @@ class Animation:
     repititions: int
     """ How many times to repeat given animation before moving onto the next animation """
     target_resolution: Tuple[int, int]
+    mirror: bool
+    """Whether or not the frames are the frames of the source flipped horizontally, so a pet only
+    needs the art of one direction of a directional animation (ie walking)"""
 
     should_run_preprocessing = False
-    """Whether or not to run preprocessing, overwrites saved images. Defaults to False"""
+    """Whether or not to remove partial transparency from the frames when they are decoded, the
+    source images are not modified. Defaults to False"""
+    resampling = "nearest"
+    """Name of the filter used to scale the frames to the target resolution, see
+    scaling.RESAMPLING_FILTERS. Defaults to "nearest" which keeps the hard edges of pixel art"""
+    frame_cache: FrameCache = None
+    """Cache of decoded and scaled frames shared by all animations. If None frames are always decoded"""
+    scaled_frames = ScaledFrameCache()
+    """Frames of every source file after they are decoded and scaled, shared by all animations so a
+    file used by several animations is only scaled once"""
+    frame_store = FrameStore()
+    """Every distinct frame of the loaded animations, animations only hold references to the frames
+    in it so frames shared by several animations are only made into tkinter images once"""
+    sprite_atlases: Dict[str, SpriteAtlas] = {}
+    """Packed atlases to take frames from instead of decoding their sources, by the pet's sprite
+    folder. Only holds atlases packed with the current resolution, resampling and preprocessing"""
+    frame_factory: Callable[[Image.Image], Any] = None
+    """Turns a decoded frame into something the pet can draw. If None frames become tkinter images
+    (PIL.ImageTk.PhotoImage). Set this to run animations without tkinter, ie headless"""
+    defer_loading = False
+    """When True animations do not load their frames when created, instead `Animation.load` (or
+    `load_animations`) has to be called. Defaults to False"""
+    load_time: float
+    """Seconds it took to decode and load the frames of this animation, None until it is loaded"""
+    decode_time: float
+    """Seconds the last `Animation.decode_frames` took, None until the frames are decoded"""
+    memory_size: int
+    """Bytes of pixel data held by the loaded frames of this animation"""
+
+    DEFAULT_FRAME_TIMER = 100
+    """ms between frames when neither a frame_timer nor the gif says otherwise"""
+    MAX_FRAME_TIMER = 100
+    """Longest time between updates of the pet, so movement and mouse interactions do not look laggy"""
 
     def __init__(
         self,
-        next_animation_states,
+        next_animation_states: Union[
+            List[AnimationStates], Dict[AnimationStates, float]
+        ],
         name: str = None,
         frames: list = None,
         gif_location: str = None,
         images_location: str = None,
-        frame_timer=100,
+        frame_timer: int = None,
         v_x: float = 0,
         v_y: float = 0,
         a_x: float = 0,
@@ -52,30 +99,35 @@ class Animation:
         frame_multiplier: int = 1,
         target_resolution: Tuple[int, int] = (100, 100),
         reverse: bool = False,
+        mirror: bool = False,
     ):
         """
         Args:
-            next_animation_states (List[Animations]): possible animations for this animation
-            to transition to once this animation finishes
+            next_animation_states (Union[List[AnimationStates], Dict[AnimationStates, float]]): possible animations
+            for this animation to transition to once this animation finishes, with how likely (relative to each other)
+            each of them is. In a list a state listed n times is n times as likely as a state listed once
             name (str, optional): The verbose name of this animation
-            frames (List[tk.PhotoImage], optional): frames of images that can be rendered by tkinter. Defaults to None.
+            frames (List[Image.Image], optional): decoded frames of the animation, they will be scaled to the
+            target_resolution. Defaults to None.
             gif_location (str, optional): Absolute path to the gif to convert into frames. Defaults to None.
             images_location (str, optional): Absolute path to the images folder to load into frames list. Defaults to None.
             target_resolution (Tuple[int, int], optional): Resolution of the frames of the animation, when drawn the canvas will be this big.
             target_resolution[0] is x width, and target_resolution[1] is y width. Defaults to (100, 100).
-            frame_timer (int, optional): time in between every frame of the animation. Defaults to 100.
+            frame_timer (int, optional): time in between every frame of the animation. Defaults to None, which uses the
+            frame durations of the gif, or 100 if the frames have no durations.
             v_x (float, optional): change in x for every frame of the animation. Defaults to 0.
             v_y (float, optional): change in y for every frame of the animation. Defaults to 0.
             a_x (float, optional): change in v_x for every frame of the animation. Defaults to 0.
             a_y (float, optional): change in v_y for every frame of the animation. Defaults to 0.
             repititions (int, optional): how many times this animation should repeat before transitioning to the next animation. Defaults to 0.
-            frame_multiplier (int, optional): how many times to duplicate frames in the frames array. This is useful for really
+            frame_multiplier (int, optional): how many frame_timers each frame is shown for. This is useful for really
             fast animations (ie have low frame_timer) to keep the animation updating position but not spazzing out the sprite. Defaults to 1.
-            if None will duplicate frames to keep updating animation automatically every 100 ms. (Prevents "laggy" mouse interactions)
             reverse (bool, optional): Wether or not to reverse the loaded frames (useful for transition animations)
+            mirror (bool, optional): Wether or not to flip the loaded frames horizontally (useful for walking the
+            other way). Defaults to False.
         """
-        self.next_animation_states = next_animation_states
-        self.frame_timer = frame_timer
+        self.transitions = TransitionTable.from_states(next_animation_states)
+        self.next_animation_states = list(self.transitions.states)
         self.v_x = v_x
         self.v_y = v_y
         self.a_x = a_x
@@ -91,154 +143,408 @@ class Animation:
                 if images_location is not None
                 else name
             )
+            if mirror and name is not None:
+                name += " (mirrored)"
         self.name = name
-        logger.info(f"Loading Animation: {self.name}")
-        if frames is None:
-            if gif_location is not None:
-                frames = Animation.load_gif_to_frames(gif_location)
-            elif images_location is not None:
-                frames = Animation.load_images_to_frames(images_location)
-            else:
-                raise Exception(
-                    "Recieved neither the frames or locations to load the frames. Could not make animation"
-                )
+        self.target_resolution = target_resolution
+        self.gif_location = gif_location
+        self.images_location = images_location
+        self.reverse = reverse
+        self.mirror = mirror
+        self.frames = []
+        self.durations = []
+        self.duration = 0
+        self._frame_ends = []
+        self.load_time = None
+        self.decode_time = None
+        self.memory_size = 0
+
+        if frames is None and gif_location is None and images_location is None:
+            raise Exception(
+                "Recieved neither the frames or locations to load the frames. Could not make animation"
+            )
+
+        # Frames are shown for as long as their duration says, but we want the pet to be updating
+        # at least every 100 ms so the frame_timer (time between updates) is capped
+        self.frame_duration = (
+            frame_timer * frame_multiplier if frame_timer is not None else None
+        )
+        self.frame_multiplier = frame_multiplier
+        self.frame_timer = min(
+            frame_timer if frame_timer is not None else Animation.DEFAULT_FRAME_TIMER,
+            Animation.MAX_FRAME_TIMER,
+        )
+
+        if frames is not None:
+            frames = Animation.apply_target_resolution(frames, target_resolution)
+            if mirror:
+                frames = Animation.mirror_frames(frames)
+            if reverse:
+                frames.reverse()
+            self.set_frames(frames)
+        elif not Animation.defer_loading:
+            self.load()
+
+    def decode_frames(
+        self,
+        resampling: str = None,
+        preprocessing: bool = None,
+        atlases: List[SpriteAtlas] = None,
+    ) -> List[Image.Image]:
+        """Decode and scale the frames of this animation from its source. This does not touch tkinter
+        so it is safe to call from a worker thread
+
+        Args:
+            resampling (str, optional): filter to scale with. Defaults to `Animation.resampling`.
+            preprocessing (bool, optional): whether or not to remove partial transparency. Defaults to
+            `Animation.should_run_preprocessing`.
+            atlases (List[SpriteAtlas], optional): atlases to take the frames from. Defaults to
+            `Animation.sprite_atlases`.
+
+        Returns:
+            List[Image.Image]: RGBA frames to pass to `Animation.set_frames`
+        """
+        start = time.perf_counter()
+        frames = Animation.load_source_frames(
+            self.target_resolution,
+            gif_location=self.gif_location,
+            images_location=self.images_location,
+            reverse=self.reverse,
+            mirror=self.mirror,
+            resampling=resampling,
+            preprocessing=preprocessing,
+            atlases=atlases,
+        )
+        # Hashing the frames here keeps it off the tkinter thread, see `FrameStore.digest`
+        for frame in frames:
+            FrameStore.digest(frame)
+        self.decode_time = time.perf_counter() - start
+        return frames
+
+    def set_frames(self, frames: List[Image.Image]):
+        """Hand the decoded frames to tkinter and use them as the frames of this animation. Must be
+        called from the thread running the tkinter main loop
+
+        Args:
+            frames (List[Image.Image]): decoded frames, see `Animation.decode_frames`
+        """
         if len(frames) == 0:
             raise Exception("There must be a least one frame in the frames list")
+        self.memory_size = sum(frame.width * frame.height * 4 for frame in frames)
+        self.durations = self.frame_durations(frames)
+        self._frame_ends = list(accumulate(self.durations))
+        self.duration = self._frame_ends[-1]
+        previous = self.frames
+        self.frames = Animation.frame_store.add(frames, Animation.to_photo_images)
+        Animation.frame_store.release(previous)
 
-        self.target_resolution = target_resolution
-        frames = Animation.apply_target_resolution(frames, target_resolution)
+    def frame_durations(self, frames: List[Image.Image]) -> List[int]:
+        """How many ms each of the decoded frames would be shown for in this animation
+
+        Args:
+            frames (List[Image.Image]): decoded frames, see `Animation.decode_frames`
+
+        Returns:
+            List[int]: ms for every frame
+        """
+        if self.frame_duration is not None:
+            return [self.frame_duration] * len(frames)
+        # Use the durations from the gif when there are any
+        return [
+            (frame.info.get("duration") or Animation.DEFAULT_FRAME_TIMER)
+            * self.frame_multiplier
+            for frame in frames
+        ]
+
+    def load(self):
+        """Decode the frames of this animation and make them ready to be drawn"""
+        logger.info(f"Loading Animation: {self.name}")
+        start = time.perf_counter()
+        self.set_frames(self.decode_frames())
+        self.load_time = time.perf_counter() - start
+
+    def unload(self):
+        """Release the frames of this animation, they can be loaded again with `Animation.load`"""
+        logger.info(f"Unloading Animation: {self.name}")
+        Animation.frame_store.release(self.frames)
+        self.frames = []
+        self.memory_size = 0
+
+    def frame_index_at(self, elapsed: float) -> int:
+        """Index of the frame that is visible a certain time into the animation
+
+        Args:
+            elapsed (float): ms since the animation started
+
+        Returns:
+            int: index in frames, or the last frame if the animation has finished
+        """
+        return min(bisect_right(self._frame_ends, elapsed), len(self.frames) - 1)
+
+    def next_change(self, elapsed: float) -> float:
+        """ms from a certain time into the animation until a different image is shown or the animation
+        ends. Frames that are the same image (see `Animation.frame_store`) are not a change
+
+        Args:
+            elapsed (float): ms since the animation started
+
+        Returns:
+            float: ms, 0 or less if the animation has finished
+        """
+        if len(self.frames) == 0:
+            return self.frame_timer
+        index = self.frame_index_at(elapsed)
+        frame = self.frames[index]
+        for end, following in zip(self._frame_ends[index:], self.frames[index + 1 :]):
+            if following is not frame:
+                return end - elapsed
+        return self.duration - elapsed
+
+    def is_loaded(self) -> bool:
+        """Whether or not the frames of this animation are ready to be drawn
+
+        Returns:
+            bool
+        """
+        return len(self.frames) > 0
+
+    @staticmethod
+    def load_source_frames(
+        target_resolution: Tuple[int, int],
+        gif_location: str = None,
+        images_location: str = None,
+        reverse: bool = False,
+        mirror: bool = False,
+        resampling: str = None,
+        preprocessing: bool = None,
+        atlases: List[SpriteAtlas] = None,
+    ) -> List[Image.Image]:
+        """Decode, scale, mirror and order the frames of an animation source. Frames are cut out of a sprite atlas
+        when one of `Animation.sprite_atlases` has them. Otherwise when `Animation.frame_cache` is set
+        the finished frames are read from (and written to) the cache so a warm start does not need to
+        decode or scale anything
+
+        The settings are read once up front, so a hot reload can decode with its new settings on another
+        thread while the pets keep decoding with the current ones
+
+        Args:
+            target_resolution (Tuple[int, int]): scale to apply where Tuple[0] is x width and Tuple[1] is y width
+            gif_location (str, optional): Absolute path to the gif to load. Defaults to None.
+            images_location (str, optional): Absolute path to the images folder to load. Defaults to None.
+            reverse (bool, optional): Wether or not to reverse the loaded frames. Defaults to False.
+            mirror (bool, optional): Wether or not to flip the loaded frames horizontally. Defaults to False.
+            resampling (str, optional): filter to scale with. Defaults to `Animation.resampling`.
+            preprocessing (bool, optional): whether or not to remove partial transparency. Defaults to
+            `Animation.should_run_preprocessing`.
+            atlases (List[SpriteAtlas], optional): atlases to take the frames from. Defaults to
+            `Animation.sprite_atlases`.
 
+        Returns:
+            List[Image.Image]: RGBA frames ready to be handed to tkinter
+        """
+        if resampling is None:
+            resampling = Animation.resampling
+        if preprocessing is None:
+            preprocessing = Animation.should_run_preprocessing
+        if atlases is None:
+            atlases = list(Animation.sprite_atlases.values())
+        source = gif_location if gif_location is not None else images_location
+        files = Animation.source_files(gif_location, images_location)
+        cache = Animation.frame_cache
+        for atlas in atlases:
+            if atlas.has_source(source, files):
+                frames = atlas.frames(source)
+                if mirror:
+                    frames = Animation.mirror_frames(frames)
+                if reverse:
+                    frames.reverse()
+                return frames
+
+        if cache is not None:
+            entry = cache.entry_path(
+                source,
+                target_resolution,
+                mirror,
+                preprocessing,
+                resampling,
+            )
+            fingerprint = FrameCache.fingerprint(files)
+            frames = cache.load(entry, fingerprint)
+            if frames is not None:
+                logger.debug(f"Loaded {len(frames)} frames of {source} from the cache")
+                if reverse:
+                    frames.reverse()
+                return frames
+
+        settings = (tuple(target_resolution), resampling, preprocessing)
+        frames = []
+        for file in files:
+            frames.extend(
+                Animation.scaled_frames.get(
+                    file,
+                    settings,
+                    lambda path: Animation.load_file_to_frames(
+                        path, target_resolution, resampling, preprocessing
+                    ),
+                )
+            )
+        if mirror:
+            frames = Animation.mirror_frames(frames)
+        if cache is not None and len(frames) > 0:
+            cache.save(entry, fingerprint, frames)
         if reverse:
             frames.reverse()
+        return frames
 
-        # We want the animation to be updating at least every 100 ms
-        # so if the frame_timer is greater than 100ms, then reduce it to be around 100ms
-        # by increasing the amount of frames
-        if self.frame_timer > 100:
-            frame_multiplier = (
-                round(frame_timer / 100) * frame_multiplier
-            )  # Keep the original multiplier as a factor
-            self.frame_timer = 100
-            logger.warning(
-                f"frame_timer is too long in {self.name}! Setting timer to 100ms, \
-                but increasing frames by a factor of {frame_multiplier}"
-            )
+    @staticmethod
+    def load_file_to_frames(
+        path: str,
+        target_resolution: Tuple[int, int],
+        resampling: str = None,
+        preprocessing: bool = None,
+    ) -> List[Image.Image]:
+        """Decode, preprocess and scale the frames of a single gif or image file
+
+        Args:
+            path (str): Path to the gif or image
+            target_resolution (Tuple[int, int]): scale to apply where Tuple[0] is x width and Tuple[1] is y width
+            resampling (str, optional): filter to scale with. Defaults to `Animation.resampling`.
+            preprocessing (bool, optional): whether or not to remove partial transparency. Defaults to
+            `Animation.should_run_preprocessing`.
 
-        self.frames = [x for item in frames for x in repeat(item, frame_multiplier)]
+        Returns:
+            List[Image.Image]: RGBA frames of the file
+        """
+        if path.lower().endswith(".gif"):
+            frames = Animation.load_gif_to_frames(path)
+        else:
+            with Image.open(path) as image:
+                frames = [image.convert("RGBA")]
+        if preprocessing is None:
+            preprocessing = Animation.should_run_preprocessing
+        if preprocessing:
+            frames = [remove_partial_transparency(frame) for frame in frames]
+        return Animation.apply_target_resolution(frames, target_resolution, resampling)
 
     @staticmethod
-    def load_gif_to_frames(path: str) -> List[tk.PhotoImage]:
+    def load_gif_to_frames(path: str) -> List[Image.Image]:
         """Given a path to a .gif file create and load the frames in the gif. Returns the frames of GIF as a list
 
+        The gif is read once, front to back. Pillow draws every frame on top of the previous one as
+        it goes, following the disposal method of the previous frame, so each frame comes out as the
+        full picture the gif shows at that point. Transparent pixels stay transparent in the RGBA frames.
+
         Args:
             path (str) Path to the gif file
 
         Returns:
-            List[tk.PhotoImage]: List of images of the frames in the gif
+            List[Image.Image]: List of RGBA images of the frames in the gif, their "duration" info is
+            how many ms the gif shows the frame for
         """
+        with Image.open(path) as gif:
+            return [frame.convert("RGBA") for frame in ImageSequence.Iterator(gif)]
 
-        file = Image.open(path)
-        number_of_frames = file.n_frames
-        file.close()
+    @staticmethod
+    def source_files(
+        gif_location: str = None, images_location: str = None
+    ) -> List[str]:
+        """The files the frames of an animation source are decoded from
 
-        frames = [
-            tk.PhotoImage(file=path, format="gif -index %i" % (i))
-            for i in range(number_of_frames)
-        ]
-        return frames
+        Args:
+            gif_location (str, optional): Absolute path to the gif. Defaults to None.
+            images_location (str, optional): Absolute path to the images folder. Defaults to None.
+
+        Returns:
+            List[str]: the gif, or the images in the folder
+        """
+        if gif_location is not None:
+            return [gif_location]
+        return Animation.list_image_files(images_location)
 
     @staticmethod
-    def load_images_to_frames(path: str) -> List[tk.PhotoImage]:
-        """Take the images, preferably png, from a source folder, path, and then convert them to
-        Tkinter images
+    def list_image_files(path: str) -> List[str]:
+        """Get all the png images from a folder, sorted alphabetically
 
         Args:
             path (str): Path to the folder with the images
-            preprocessor (Callable, optional): function to handle image conversions before adding them
-            to the array (such as removing transparency). Defaults to None
 
         Returns:
-            List[tk.PhotoImage]: [description]
+            List[str]: absolute paths of the images
         """
-
-        # Get all the images from the folder and sort alphabetically
-        files = [
+        return [
             join(path, f)
             for f in sorted(listdir(path))
             if (isfile(join(path, f)) and f.split(".").pop().lower() == "png")
         ]
-        if Animation.should_run_preprocessing:
-            for path in files:
-                Animation.remove_partial_transparency_png(path)
 
-        frames = [tk.PhotoImage(file=path) for path in files]
+    @staticmethod
+    def load_images_to_frames(path: str) -> List[Image.Image]:
+        """Take the images, preferably png, from a source folder, path, and decode them
+
+        Args:
+            path (str): Path to the folder with the images
+
+        Returns:
+            List[Image.Image]: List of RGBA images, one for every image in the folder
+        """
+        frames = []
+        for file in Animation.list_image_files(path):
+            with Image.open(file) as image:
+                frames.append(image.convert("RGBA"))
         return frames
 
     @staticmethod
     def apply_target_resolution(
-        frames: List[tk.PhotoImage], target_resolution: Tuple[int, int]
-    ) -> List[tk.PhotoImage]:
-        """Given a list of frames, scale it to a certain resolution
+        frames: List[Image.Image],
+        target_resolution: Tuple[int, int],
+        resampling: str = None,
+    ) -> List[Image.Image]:
+        """Given a list of frames, scale it to exactly a certain resolution in one pass with the
+        `Animation.resampling` filter
 
         Args:
-            frames (List[tk.PhotoImage]) List of frames to alter
+            frames (List[Image.Image]) List of frames to alter
             target_resolution (Tuple[int, int]) scale to apply where Tuple[0] is x width and Tuple[1] is y width
+            resampling (str, optional): filter to scale with. Defaults to `Animation.resampling`.
 
 
         Returns:
-            List[tk.PhotoImage]: List of images of the frames in the gif
+            List[Image.Image]: List of the scaled frames
         """
+        if resampling is None:
+            resampling = Animation.resampling
+        return scale_frames(frames, target_resolution, resampling)
 
-        for i in range(len(frames)):
-            image = frames[i]
-            scale_w = target_resolution[0] / image.width()
-            scale_h = target_resolution[1] / image.height()
-            # downscale
-            if scale_w < 1:
-                image = image.subsample(int(1 / scale_w), 1)
-            # upscale
-            elif scale_w > 1:
-                image = image.zoom(int(scale_w), 1)
-            # downscale
-            if scale_h < 1:
-                image = image.subsample(1, int(1 / scale_h))
-            # upscale
-            elif scale_h > 1:
-                image = image.zoom(1, int(scale_h))
-            # image.zoom(scale_w, scale_h)
-            frames[i] = image
-        return frames
+    @staticmethod
+    def mirror_frames(frames: List[Image.Image]) -> List[Image.Image]:
+        """Flip already decoded frames horizontally, keeping their durations. This is a copy of the
+        pixels of every frame, much cheaper than decoding and scaling another direction of the art
+
+        Args:
+            frames (List[Image.Image]): decoded frames, they are not modified
 
-    def remove_partial_transparency_png(path: str) -> Image:
-        """Given a path to a png, try to force all data to be either completly transparent
-        or completly opaque. Saves image when done editing the image
+        Returns:
+            List[Image.Image]: the mirrored frames, in the same order
+        """
+        return [frame.transpose(Image.FLIP_LEFT_RIGHT) for frame in frames]
+
+    @staticmethod
+    def to_photo_images(frames: List[Image.Image]) -> List[Any]:
+        """Hand decoded frames to tkinter (or `Animation.frame_factory`) so they can be drawn
 
         Args:
-            path (str): absolute path to the file
+            frames (List[Image.Image]): frames to convert
+
+        Returns:
+            List[Any]: images that can be rendered by tkinter, or what frame_factory made
         """
-        logger.info("START:remove_partial_transparency_png -> " + path)
-        # We assume that the data is a png
-        png = Image.open(path)
-        # Just return the image if it is not a png, we don't know the format otherwise
-        if path.split(".").pop().lower() != "png":
-            return png
-
-        png = png.convert("RGBA")
-
-        # alpha_composite = Image.alpha_composite(background, png).show()
-        # alpha_composite.save('foo.jpg', 'JPEG', quality=80)
-        datas = png.getdata()
-
-        newData = []
-        for item in datas:
-            if item[3] != 255:
-                newData.append((item[0], item[1], item[2], round(item[3] / 255) * 255))
-            else:
-                newData.append(item)
-
-        png.putdata(newData)
-        png.save(path, path.split(".").pop())
-        return png
+        factory = Animation.frame_factory
+        if factory is None:
+            # Only needed with tkinter, so headless runs never import it
+            from PIL import ImageTk
+
+            factory = ImageTk.PhotoImage
+        return [factory(frame) for frame in frames]
 
     def next(self, animator) -> AnimationStates:
         """Provides the next animation after this animation finishes. If there are repitions, then it will repeat until
@@ -255,7 +561,7 @@ class Animation:
             return animator.state
         else:
             animator.repititions = 0
-        return random.choice(self.next_animation_states)
+        return self.transitions.pick(animator.random)
 
     def get_velocity(self) -> Tuple[int, int]:
         """returns the change in position that this animation expects
@@ -274,4 +580,4 @@ class Animation:
         return (self.a_x, self.a_y)
 
     def __repr__(self):
-        return f"<Animation: {len(self.frames)} frames each at {self.frame_timer} ms>"
+        return f"<Animation: {len(self.frames)} frames over {self.duration} ms, updating every {self.frame_timer} ms>"
@@ -1,7 +1,9 @@
+import random
 from typing import Dict
-from src import logger
+from src.tracing import tracer
 from .animation_states import AnimationStates
 from .animation import Animation
+from .frame_residency import FrameResidency
 
 
 class Animator:
@@ -9,12 +11,20 @@ class Animator:
 
     frame_number: int
     """Current frame of the animation"""
+    elapsed: float
+    """ms since the current repitition of the animation started"""
     state: AnimationStates
     """Current animation state (ie the animation that should be playing"""
     animations: Dict[AnimationStates, Animation]
     """All supported animations"""
     repititions: int
     """The current repitition of an animation that this is on"""
+    lazy: bool
+    """Whether or not animations are only loaded once their state is entered"""
+    residency: FrameResidency
+    """Decides which animations are loaded when lazy, None otherwise"""
+    random: random.Random
+    """Picks the next animations, seed it for reproducible runs"""
 
     def __init__(
         self,
@@ -22,6 +32,10 @@ class Animator:
         state: AnimationStates,
         animations: Dict[AnimationStates, Animation],
         repititions=0,
+        lazy: bool = False,
+        memory_budget: int = None,
+        residency: FrameResidency = None,
+        seed: int = None,
     ):
         """
         Args:
@@ -29,11 +43,33 @@ class Animator:
             state (AnimationStates): Current animation state
             animations (Dict[AnimationStates, Animation]): All possible animations to choose from
             repititions (int): The current repitation of a animation that we are on. Defaults to 0.
+            lazy (bool, optional): Load the frames of an animation the first time its state is entered, and prefetch
+            the animations that can follow the current one in the background. Defaults to False.
+            memory_budget (int, optional): When lazy, the most bytes of frames to keep loaded. Least recently used
+            animations are unloaded when this is exceeded. Defaults to None, no limit.
+            residency (FrameResidency, optional): When lazy, decides which animations are loaded. Pass the same
+            residency to every animator sharing the animations. Defaults to None, the animator makes its own.
+            seed (int, optional): seed of the random number generator picking the next animations, the same seed
+            gives the same sequence of animations. Defaults to None, a different sequence every run.
         """
         self.frame_number = frame_number
+        self.elapsed = 0
         self.state = state
         self.animations = animations
         self.repititions = repititions
+        self.lazy = lazy
+        self.random = random.Random(seed)
+        self.residency = None
+        if self.lazy:
+            self.residency = (
+                residency
+                if residency is not None
+                else FrameResidency(animations, memory_budget)
+            )
+        # The animation this animator has told the residency it is playing
+        self._playing: Animation = None
+        if self.lazy:
+            self.ensure_loaded(self.state)
 
     def set_animation_state(self, state: AnimationStates) -> bool:
         """Update the state and reset variables that change with each animation
@@ -45,13 +81,53 @@ class Animator:
         """
         # If the state is the same, then do nothing
         # As we don't want the animation to keep reseting
-        logger.debug(f"{self.state.__repr__()} changing to {state.__repr__()}")
         if state == self.state:
             return False
+        if tracer.enabled:
+            tracer.trace(
+                "state", animator=id(self), old=self.state.name, new=state.name
+            )
+        if self.lazy:
+            self.ensure_loaded(state)
         self.frame_number = 0
+        self.elapsed = 0
         self.repititions = 0
         self.state = state
         return True
 
+    def ensure_loaded(self, state: AnimationStates):
+        """Make sure the animation of a state has its frames loaded before it is played
+
+        Args:
+            state (AnimationStates): state that is about to be played
+        """
+        animation = self.animations[state]
+        if self.residency is not None:
+            previous = self._playing
+            self._playing = animation
+            self.residency.enter(animation, previous)
+        elif not animation.is_loaded():
+            animation.load()
+
+    def replace_animations(self, replacements: Dict[Animation, Animation]):
+        """Some animations were rebuilt (ie reloaded) and swapped into animations, keep playing the
+        current state from where it was. Call this after animations has been updated. When the current
+        state is no longer one of the animations the animator starts over from IDLE
+
+        Args:
+            replacements (Dict[Animation, Animation]): new animation by the animation it replaces
+        """
+        if self._playing in replacements:
+            self._playing = replacements[self._playing]
+        if self.state not in self.animations:
+            self.frame_number = 0
+            self.elapsed = 0
+            self.repititions = 0
+            self.state = AnimationStates.IDLE
+        animation = self.animations[self.state]
+        if self.lazy or not animation.is_loaded():
+            self.ensure_loaded(self.state)
+        self.frame_number = animation.frame_index_at(self.elapsed)
+
     def __repr__(self):
         return f"<Animator: {str(self.state)} on frame {self.frame_number}>"
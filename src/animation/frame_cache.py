@@ -0,0 +1,185 @@
+import hashlib
+import os
+import pathlib
+import struct
+import threading
+import zlib
+from typing import List, Optional, Tuple
+from PIL import Image
+from src import logger
+
+
+class FrameCache:
+    """Persistent, content addressed store of decoded and scaled animation frames.
+
+    Every entry holds the frames of one animation source (a gif or a folder of images) after they
+    have been decoded, preprocessed and scaled. Frames are stored as raw RGBA
+    bytes in a single zlib stream so a warm start only has to inflate the data, it never has to
+    decode or scale an image.
+
+    An entry's file name is derived from the source path and the settings that change how the frames
+    look (target_resolution, mirror, preprocessing, resampling), while the source files' modification times and
+    sizes are stored as a fingerprint inside the entry. Changing a sprite or a setting therefore only
+    invalidates the entries that depend on it. Frames are stored in the order of the source, so an
+    animation that plays a source backwards uses the same entry as the ones that play it forwards,
+    mirrored frames are stored in an entry of their own so they do not have to be flipped again.
+    """
+
+    MAGIC = b"DPFC"
+    """Identifies a frame cache file"""
+    FORMAT_VERSION = 5
+    """Bump whenever the binary layout or the way frames are produced changes"""
+    HEADER = struct.Struct("<4sH20sI")
+    """magic, format version, source fingerprint, number of frames"""
+    FRAME_HEADER = struct.Struct("<HHI")
+    """width, height and duration in ms (0 if unknown) of a single frame"""
+    EXTENSION = ".frames"
+
+    directory: str
+    """Folder the cache entries are written to"""
+
+    def __init__(self, directory: str = None):
+        """
+        Args:
+            directory (str, optional): Folder to keep the cache entries in. Defaults to ".cache/frames"
+            in the current working directory.
+        """
+        if directory is None:
+            directory = os.path.join(pathlib.Path().resolve(), ".cache", "frames")
+        self.directory = directory
+
+    def entry_path(
+        self,
+        source: str,
+        target_resolution: Tuple[int, int],
+        mirror: bool,
+        preprocessing: bool,
+        resampling: str = "nearest",
+    ) -> str:
+        """Path of the cache entry for the given source and settings
+
+        Args:
+            source (str): path to the gif or the folder of images the frames come from
+            target_resolution (Tuple[int, int]): resolution the frames are scaled to
+            mirror (bool): whether or not the frames are flipped horizontally
+            preprocessing (bool): whether or not preprocessing was applied to the frames
+            resampling (str, optional): name of the filter the frames were scaled with. Defaults to "nearest".
+
+        Returns:
+            str: absolute path of the entry
+        """
+        key = "|".join(
+            [
+                str(FrameCache.FORMAT_VERSION),
+                os.path.abspath(source),
+                f"{target_resolution[0]}x{target_resolution[1]}",
+                str(bool(mirror)),
+                str(bool(preprocessing)),
+                resampling,
+            ]
+        )
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + FrameCache.EXTENSION)
+
+    @staticmethod
+    def fingerprint(files: List[str]) -> bytes:
+        """Digest of the modification time and size of every source file, used to detect stale entries
+
+        Args:
+            files (List[str]): files the frames are decoded from
+
+        Returns:
+            bytes: 20 byte sha1 digest
+        """
+        digest = hashlib.sha1()
+        for path in files:
+            stat = os.stat(path)
+            digest.update(f"{path}|{stat.st_mtime_ns}|{stat.st_size};".encode("utf-8"))
+        return digest.digest()
+
+    def load(self, entry: str, fingerprint: bytes) -> Optional[List[Image.Image]]:
+        """Read the frames of a cache entry
+
+        Args:
+            entry (str): path of the entry, see `FrameCache.entry_path`
+            fingerprint (bytes): current fingerprint of the source files
+
+        Returns:
+            Optional[List[Image.Image]]: RGBA frames, or None if there is no valid entry
+        """
+        try:
+            with open(entry, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            magic, version, stored_fingerprint, count = FrameCache.HEADER.unpack_from(
+                data, 0
+            )
+            if (
+                magic != FrameCache.MAGIC
+                or version != FrameCache.FORMAT_VERSION
+                or stored_fingerprint != fingerprint
+            ):
+                return None
+
+            offset = FrameCache.HEADER.size
+            sizes = []
+            for _ in range(count):
+                sizes.append(FrameCache.FRAME_HEADER.unpack_from(data, offset))
+                offset += FrameCache.FRAME_HEADER.size
+            pixels = zlib.decompress(data[offset:])
+
+            frames = []
+            start = 0
+            for width, height, duration in sizes:
+                end = start + width * height * 4
+                frame = Image.frombuffer(
+                    "RGBA", (width, height), pixels[start:end], "raw", "RGBA", 0, 1
+                )
+                if duration > 0:
+                    frame.info["duration"] = duration
+                frames.append(frame)
+                start = end
+            return frames
+        except (struct.error, zlib.error, ValueError) as e:
+            logger.warning(f"Ignoring corrupt frame cache entry {entry}: {e}")
+            return None
+
+    def save(self, entry: str, fingerprint: bytes, frames: List[Image.Image]):
+        """Write frames to a cache entry. Failing to write the cache is not fatal, the frames will
+        just be decoded again on the next start
+
+        Args:
+            entry (str): path of the entry, see `FrameCache.entry_path`
+            fingerprint (bytes): current fingerprint of the source files
+            frames (List[Image.Image]): frames to store, they will be converted to RGBA. Their "duration" info
+            is kept
+        """
+        frames = [f if f.mode == "RGBA" else f.convert("RGBA") for f in frames]
+        header = [
+            FrameCache.HEADER.pack(
+                FrameCache.MAGIC, FrameCache.FORMAT_VERSION, fingerprint, len(frames)
+            )
+        ]
+        header.extend(
+            FrameCache.FRAME_HEADER.pack(*f.size, int(f.info.get("duration") or 0))
+            for f in frames
+        )
+        pixels = zlib.compress(b"".join(f.tobytes() for f in frames), 1)
+
+        # Write to a temporary file first so a crash never leaves a half written entry behind
+        tmp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(b"".join(header))
+                f.write(pixels)
+            os.replace(tmp, entry)
+        except OSError as e:
+            logger.warning(f"Could not write frame cache entry {entry}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
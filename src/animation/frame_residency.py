@@ -0,0 +1,140 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+from .animation_states import AnimationStates
+from .animation import Animation
+
+
+class FrameResidency:
+    """Decides which animations of a set of animations have their frames loaded. Animations are
+    loaded when an animator enters their state, and the animations that can follow any animation
+    being played are prefetched in the background. When over the memory budget the least recently
+    used animations that no animator is playing are unloaded.
+
+    One instance is shared by every animator playing the same set of animations, so pets sharing
+    frames never unload each other's current animation.
+    """
+
+    animations: Dict[AnimationStates, Animation]
+    """The set of animations this manages"""
+    memory_budget: int
+    """Most bytes of frames to keep loaded, None for no limit"""
+
+    def __init__(
+        self,
+        animations: Dict[AnimationStates, Animation],
+        memory_budget: int = None,
+    ):
+        """
+        Args:
+            animations (Dict[AnimationStates, Animation]): the set of animations to manage
+            memory_budget (int, optional): Most bytes of frames to keep loaded. Defaults to None, no limit.
+        """
+        self.animations = animations
+        self.memory_budget = memory_budget
+        # Loaded animations, least recently used first
+        self._loaded: "OrderedDict[Animation, None]" = OrderedDict()
+        # How many animators are currently playing each animation
+        self._in_use: Dict[Animation, int] = {}
+        # Frames that are being decoded in the background, but are not handed to tkinter yet
+        self._prefetching: Dict[Animation, Future] = {}
+        self._prefetcher: ThreadPoolExecutor = None
+
+    def enter(self, animation: Animation, previous: Animation = None):
+        """An animator starts playing an animation, make sure its frames are loaded
+
+        Args:
+            animation (Animation): animation that is about to be played
+            previous (Animation, optional): animation the animator was playing before. Defaults to None.
+        """
+        if previous is not None and self._in_use.get(previous, 0) > 0:
+            self._in_use[previous] -= 1
+        self._in_use[animation] = self._in_use.get(animation, 0) + 1
+
+        if not animation.is_loaded():
+            future = self._prefetching.pop(animation, None)
+            if future is not None:
+                # Waits for the decoding to finish if it is still running
+                start = time.perf_counter()
+                animation.set_frames(future.result())
+                animation.load_time = animation.decode_time + (
+                    time.perf_counter() - start
+                )
+            else:
+                animation.load()
+        self._loaded[animation] = None
+        self._loaded.move_to_end(animation)
+        self._evict()
+        self._prefetch()
+
+    def replace(self, old: Animation, new: Animation):
+        """An animation was rebuilt (ie reloaded), manage the new one in its place
+
+        Args:
+            old (Animation): the animation that is no longer used
+            new (Animation): the animation replacing it
+        """
+        users = self._in_use.pop(old, 0)
+        if users > 0:
+            self._in_use[new] = self._in_use.get(new, 0) + users
+        future = self._prefetching.pop(old, None)
+        if future is not None:
+            future.cancel()
+        if old in self._loaded:
+            del self._loaded[old]
+        if new.is_loaded():
+            self._loaded[new] = None
+
+    def memory_used(self) -> int:
+        """Bytes of frames currently loaded. Frames the animations share (see `Animation.frame_store`)
+        are only counted once
+
+        Returns:
+            int
+        """
+        return Animation.frame_store.shared_memory_size(
+            animation.frames for animation in self._loaded
+        )
+
+    def _evict(self):
+        """Unload least recently used animations until the loaded frames fit in the memory budget"""
+        if self.memory_budget is None:
+            return
+        used = self.memory_used()
+        for animation in list(self._loaded):
+            if used <= self.memory_budget:
+                break
+            if self._in_use.get(animation, 0) > 0:
+                continue
+            animation.unload()
+            del self._loaded[animation]
+            # Frames that other loaded animations still use are not freed
+            used = self.memory_used()
+
+    def _prefetch(self):
+        """Start decoding the frames of the animations that can follow the ones being played"""
+        upcoming = []
+        for animation, users in self._in_use.items():
+            if users == 0:
+                continue
+            for state in animation.next_animation_states:
+                next_animation = self.animations.get(state)
+                if next_animation is not None and next_animation not in upcoming:
+                    upcoming.append(next_animation)
+
+        # Frames decoded for animations that can no longer be reached are dropped
+        for animation in list(self._prefetching):
+            if animation not in upcoming:
+                self._prefetching.pop(animation).cancel()
+
+        for animation in upcoming:
+            if animation.is_loaded() or animation in self._prefetching:
+                continue
+            if self._prefetcher is None:
+                self._prefetcher = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="AnimationPrefetch"
+                )
+            self._prefetching[animation] = self._prefetcher.submit(
+                animation.decode_frames
+            )
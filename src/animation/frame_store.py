@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, List
+from PIL import Image
+
+DIGEST_ATTRIBUTE = "_frame_digest"
+"""Attribute of a frame its digest is kept in, so a frame is only hashed once. It is not kept in the
+frame's info as that is copied to the images made from the frame (ie when it is scaled or mirrored)"""
+
+
+class FrameStore:
+    """Holds every distinct frame of the loaded animations exactly once.
+
+    Frames are identified by a hash of their pixels, so frames that are the same are only handed to
+    tkinter (made into a PhotoImage) once, no matter if they come from the same source played
+    backwards by another animation (ie the horse's SLEEP_TO_IDLE), the same gif used for several
+    states (ie the cat's GRABBED and FALLING), or are repeated within a gif. An animation's frames
+    are then only a view of the store: a list of references to the shared images, in the order and
+    with the repeats the animation plays them in.
+
+    Every reference is counted, an image is dropped from the store once the last animation that uses
+    it releases it.
+    """
+
+    def __init__(self):
+        # digest -> [image, references, bytes]
+        self._frames: Dict[bytes, list] = {}
+        # id of an image -> its digest
+        self._digests: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(frame: Image.Image) -> bytes:
+        """Hash of the size, mode and pixels of a frame. The hash is kept on the frame, so
+        hashing a frame again is free. Safe to call from worker threads, which is where the frames
+        should be hashed as this is the expensive part of adding them to the store
+
+        Args:
+            frame (Image.Image)
+
+        Returns:
+            bytes
+        """
+        digest = getattr(frame, DIGEST_ATTRIBUTE, None)
+        if digest is None:
+            digest = hashlib.sha1(frame.tobytes())
+            digest.update(f"{frame.mode}{frame.size}".encode("utf-8"))
+            digest = digest.digest()
+            setattr(frame, DIGEST_ATTRIBUTE, digest)
+        return digest
+
+    def add(
+        self,
+        frames: List[Image.Image],
+        make: Callable[[List[Image.Image]], List[Any]],
+    ) -> List[Any]:
+        """Get the images of frames, only making images for the frames that are not in the store yet
+
+        Args:
+            frames (List[Image.Image]): decoded frames
+            make (Callable[[List[Image.Image]], List[Any]]): turns frames into images that can be drawn,
+            ie `Animation.to_photo_images`
+
+        Returns:
+            List[Any]: an image for every frame, frames that are the same get the same image
+        """
+        digests = [FrameStore.digest(frame) for frame in frames]
+        with self._lock:
+            missing: Dict[bytes, Image.Image] = {}
+            for digest, frame in zip(digests, frames):
+                if digest not in self._frames and digest not in missing:
+                    missing[digest] = frame
+            if len(missing) > 0:
+                for (digest, frame), image in zip(
+                    missing.items(), make(list(missing.values()))
+                ):
+                    self._frames[digest] = [image, 0, frame.width * frame.height * 4]
+                    self._digests[id(image)] = digest
+            images = []
+            for digest in digests:
+                entry = self._frames[digest]
+                entry[1] += 1
+                images.append(entry[0])
+        return images
+
+    def release(self, images: List[Any]):
+        """Stop using images that were handed out by `FrameStore.add`
+
+        Args:
+            images (List[Any]): the images, as returned by add
+        """
+        with self._lock:
+            for image in images:
+                digest = self._digests.get(id(image))
+                if digest is None:
+                    continue
+                entry = self._frames[digest]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._frames[digest]
+                    del self._digests[id(image)]
+
+    def memory_size(self) -> int:
+        """Bytes of pixel data of the distinct frames in the store
+
+        Returns:
+            int
+        """
+        with self._lock:
+            return sum(entry[2] for entry in self._frames.values())
+
+    def shared_memory_size(self, frame_lists: Iterable[List[Any]]) -> int:
+        """Bytes of pixel data of the images in several lists of images handed out by `FrameStore.add`,
+        an image that is in more than one of the lists (or in one list more than once) is counted once
+
+        Args:
+            frame_lists (Iterable[List[Any]]): ie the frames of several animations
+
+        Returns:
+            int
+        """
+        with self._lock:
+            digests = {
+                self._digests.get(id(image))
+                for frames in frame_lists
+                for image in frames
+            }
+            digests.discard(None)
+            return sum(self._frames[digest][2] for digest in digests)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __repr__(self):
+        return f"<FrameStore: {len(self)} frames, {self.memory_size() / 1024 / 1024:.1f}MB>"
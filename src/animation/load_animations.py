@@ -1,238 +1,191 @@
-from itertools import repeat
-import pathlib
 import os
+import shutil
+import tempfile
 from typing import Tuple, Dict
+from src import logger
 from .animation_states import AnimationStates
 from .animation import Animation
+from .frame_cache import FrameCache
+from .loader import load_animations
+from .pet_definition import load_pet_definition
+from .sprite_atlas import SpriteAtlas
+from .scaling import get_resampling_filter
+
+_animation_sets: Dict[
+    Tuple[str, Tuple[int, int], bool, str], Dict[AnimationStates, Animation]
+] = {}
+"""Animations that have been loaded already, by pet name, resolution, preprocessing and resampling"""
 
 
 def get_animations(
-    pet_name: str, target_resolution: Tuple[int, int], should_run_preprocessing: bool
+    pet_name: str,
+    target_resolution: Tuple[int, int],
+    should_run_preprocessing: bool,
+    workers: int = None,
+    lazy: bool = False,
+    resampling: str = "nearest",
 ) -> Dict[AnimationStates, Animation]:
-    """Loads all of the animations for a pet and their source files into a dictionary
+    """Loads all of the animations for a pet and their source files into a dictionary. The animations are
+    shared, so asking for the same pet at the same resolution again returns the same dictionary, loaded
+    unless every call asked for it lazily
     Args:
         pet_name (str): name of the pet, ie the name of folder its animations are in
         target_resolution (Tuple[int, int]): target size of the animations
+        should_run_preprocessing (bool): whether or not to preprocess the source images
+        workers (int, optional): number of threads decoding the animations. Defaults to None, one per cpu core
+        lazy (bool, optional): do not load any frames, the animator loads them when they are needed. Defaults to False.
+        resampling (str, optional): filter used to scale the frames, see scaling.RESAMPLING_FILTERS. Defaults to "nearest".
     Returns:
         Dict[AnimationStates, Animation]
     """
-    # Load the animation gifs from the sprite folder and make each of the gifs into a list of frames
-    # Path to sprites we want to use
-    impath = pathlib.Path().resolve()
-    impath = os.path.join(impath, "src", "sprites")
+    # Fail before anything is loaded when the filter name or the pet is wrong
+    get_resampling_filter(resampling)
+    definition = load_pet_definition(pet_name)
+    key = (pet_name, tuple(target_resolution), should_run_preprocessing, resampling)
+    animations = _animation_sets.get(key)
+    if animations is not None and (
+        lazy or all(animation.is_loaded() for animation in animations.values())
+    ):
+        return animations
+
     Animation.should_run_preprocessing = should_run_preprocessing
-    # **** This can be whatever set of animations you want it to be
-    # **** I just like horses so I have set it to that
-    if pet_name == "cat":
-        animations = get_cat_animations(impath, target_resolution)
-    elif pet_name == "horse":
-        animations = get_horse_animations(impath, target_resolution)
+    Animation.resampling = resampling
+    # Decoded and scaled frames are kept between runs so warm starts can skip decoding
+    if Animation.frame_cache is None:
+        Animation.frame_cache = FrameCache()
+    # A packed sprite atlas replaces decoding every source, as long as it was packed with these settings
+    Animation.sprite_atlases.pop(definition.directory, None)
+    atlas = SpriteAtlas.open(definition.directory)
+    if atlas is not None:
+        if atlas.matches(target_resolution, resampling, should_run_preprocessing):
+            logger.info(f"Loading {pet_name} from its sprite atlas")
+            Animation.sprite_atlases[definition.directory] = atlas
+        else:
+            logger.warning(
+                f"The sprite atlas of {pet_name} was packed with other settings, run `python -m src.animation pack {pet_name}` to update it"
+            )
+    if animations is None:
+        animations = describe_animations(pet_name, target_resolution)
+        _animation_sets[key] = animations
 
+    # A set that was asked for lazily before is loaded now, with the settings it was described with
+    if not lazy:
+        load_animations(animations, workers)
     return animations
 
 
-def get_cat_animations(impath: str, target_resolution: Tuple[int, int]):
-    """Loads all of the animations for a cat
+def pack_sprite_atlas(
+    pet_name: str,
+    target_resolution: Tuple[int, int],
+    should_run_preprocessing: bool,
+    resampling: str = "nearest",
+) -> SpriteAtlas:
+    """Pack every frame a pet uses into a sprite atlas in its sprite folder, which `get_animations`
+    then loads instead of the separate source files
     Args:
-        impath (str): path to the folder the animations are in
+        pet_name (str): name of the pet, ie the name of folder its animations are in
         target_resolution (Tuple[int, int]): target size of the animations
+        should_run_preprocessing (bool): whether or not to preprocess the source images
+        resampling (str, optional): filter used to scale the frames, see scaling.RESAMPLING_FILTERS. Defaults to "nearest".
     Returns:
-        Dict[AnimationStates, Animation]
+        SpriteAtlas
     """
-    pj = os.path.join
-    impath = pj(impath, "cat")
-    standing_actions = [AnimationStates.IDLE_TO_SLEEP]
-    standing_actions.extend(repeat(AnimationStates.IDLE, 3))
-    standing_actions.extend(repeat(AnimationStates.WALK_NEGATIVE, 4))
-    standing_actions.extend(repeat(AnimationStates.WALK_POSITIVE, 4))
+    get_resampling_filter(resampling)
+    Animation.should_run_preprocessing = should_run_preprocessing
+    Animation.resampling = resampling
+    pet_directory = load_pet_definition(pet_name).directory
+    # Always pack from the source files, never from an older atlas
+    Animation.sprite_atlases.pop(pet_directory, None)
+    animations = describe_animations(pet_name, target_resolution)
+
+    sources = {}
+    files = {}
+    states = {}
+    for state, animation in animations.items():
+        source = animation.gif_location or animation.images_location
+        if source not in sources:
+            sources[source] = Animation.load_source_frames(
+                target_resolution,
+                gif_location=animation.gif_location,
+                images_location=animation.images_location,
+            )
+            files[source] = Animation.source_files(
+                animation.gif_location, animation.images_location
+            )
+        durations = animation.frame_durations(sources[source])
+        states[state.name] = {
+            "source": os.path.relpath(source, pet_directory).replace(os.sep, "/"),
+            "reverse": animation.reverse,
+            "mirror": animation.mirror,
+            "durations": durations[::-1] if animation.reverse else durations,
+            "frame_timer": animation.frame_timer,
+            "repititions": animation.repititions,
+            "next": {
+                next_state.name: weight
+                for next_state, weight in zip(
+                    animation.transitions.states, animation.transitions.weights
+                )
+            },
+        }
+    Animation.scaled_frames.clear()
+    return SpriteAtlas.pack(
+        pet_directory,
+        sources,
+        files,
+        states,
+        target_resolution,
+        resampling,
+        should_run_preprocessing,
+    )
 
-    # These are the animations that our spite can do.
-    # ! IMPORTANT:
-    # ! NOTE: in order to have the pet fall after being grabbed, there must be key value pair in the animations dict for
-    # ! AnimationStates.FALLING, and then for the falling animation to end there must be an animation for AnimationStates.LANDED.
-    # ! See the example in src.animations.get_cat_animations where although not having gif files for falling and landing animations
-    # ! other animations are repurposed for these animation states.
-    animations: Dict[AnimationStates, Animation] = {
-        AnimationStates.IDLE: Animation(
-            standing_actions,
-            gif_location=pj(impath, "idle.gif"),
-            frame_timer=400,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.IDLE_TO_SLEEP: Animation(
-            [AnimationStates.SLEEP],
-            gif_location=pj(impath, "idle_to_sleep.gif"),
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.SLEEP: Animation(
-            [
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP_TO_IDLE,
-            ],
-            gif_location=pj(impath, "sleep.gif"),
-            frame_timer=1000,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.SLEEP_TO_IDLE: Animation(
-            [AnimationStates.IDLE],
-            gif_location=pj(impath, "sleep_to_idle.gif"),
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.WALK_POSITIVE: Animation(
-            standing_actions,
-            gif_location=pj(impath, "walking_positive.gif"),
-            v_x=3,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.WALK_NEGATIVE: Animation(
-            standing_actions,
-            gif_location=pj(impath, "walking_negative.gif"),
-            v_x=-3,
-            target_resolution=target_resolution,
-        ),
-        # There is no grabbed gif, so just speed up the walking gif
-        AnimationStates.GRABBED: Animation(
-            [AnimationStates.GRABBED],
-            gif_location=pj(impath, "walking_positive.gif"),
-            frame_timer=50,
-            target_resolution=target_resolution,
-        ),
-        # There is no falling gif, so just speed up the walking gif
-        # but as position updates after every frame of animation, incease
-        # update speed to be smoother (increase duplicate frames to prevent)
-        # spazzing looking cat
-        AnimationStates.FALLING: Animation(
-            [AnimationStates.FALLING],
-            gif_location=pj(impath, "walking_negative.gif"),
-            frame_timer=10,
-            frame_multiplier=2,
-            target_resolution=target_resolution,
-            a_y=2,
-        ),
-    }
-    # No landed animation, but instead return the cat to its idle animation so that
-    # it can go to a next animation state after falling
-    animations[AnimationStates.LANDED] = animations[AnimationStates.IDLE]
-    return animations
 
+def check_sprite_atlas(pet_name: str):
+    """Check that every source in a pet's packed sprite atlas is still taken from the atlas once the
+    sprite folder is copied somewhere else, like the pyinstaller build does with it
 
-def get_horse_animations(impath: str, target_resolution: Tuple[int, int]):
-    """Loads all of the animations for a horse
     Args:
-        impath (str): path to the folder the animations are in
-        target_resolution (Tuple[int, int]): target size of the animations
-    Returns:
-        Dict[AnimationStates, Animation]
+        pet_name (str): name of the pet, ie the name of folder its animations are in
+
+    Raises:
+        Exception: when the pet has no atlas, or sources in the copy would be decoded instead
     """
-    pj = os.path.join
-    impath = pj(impath, "horse", "Horse")
-    standing_actions = [AnimationStates.IDLE_TO_SLEEP, AnimationStates.GRAZING_START]
-    standing_actions.extend(repeat(AnimationStates.IDLE, 3))
-    standing_actions.extend(repeat(AnimationStates.WALK_NEGATIVE, 5))
-    standing_actions.extend(repeat(AnimationStates.WALK_POSITIVE, 5))
+    pet_directory = load_pet_definition(pet_name).directory
+    with tempfile.TemporaryDirectory() as temporary:
+        copy = os.path.join(temporary, pet_name)
+        shutil.copytree(pet_directory, copy)
+        atlas = SpriteAtlas.open(copy)
+        if atlas is None:
+            raise Exception(f"{pet_name} has no sprite atlas, pack it first")
+        stale = []
+        for key in atlas.index["sources"]:
+            source = os.path.join(copy, *key.split("/"))
+            files = (
+                [source]
+                if os.path.isfile(source)
+                else Animation.list_image_files(source)
+            )
+            if not atlas.has_source(source, files):
+                stale.append(key)
+    if len(stale) > 0:
+        raise Exception(
+            f"The sprite atlas of {pet_name} is not used for: {', '.join(stale)}"
+        )
+    logger.info(f"The sprite atlas of {pet_name} is used for all of its sources")
 
-    # These are the animations that our spite can do.
-    # ! IMPORTANT:
-    # ! NOTE: in order to have the pet fall after being grabbed, there must be key value pair in the animations dict for
-    # ! AnimationStates.FALLING, and then for the falling animation to end there must be an animation for AnimationStates.LANDED.
-    # ! See the example in src.animations.get_cat_animations where although not having gif files for falling and landing animations
-    # ! other animations are repurposed for these animation states.
-    animations: Dict[AnimationStates, Animation] = {
-        ######### IDLE
-        AnimationStates.IDLE: Animation(
-            standing_actions,
-            images_location=pj(impath, "Idle", "Right"),
-            target_resolution=target_resolution,
-            repititions=3,
-        ),
-        ######### SLEEP
-        AnimationStates.IDLE_TO_SLEEP: Animation(
-            [AnimationStates.SLEEP],
-            images_location=pj(impath, "Sleep", "IdleToSleep"),
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.SLEEP: Animation(
-            [
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP,
-                AnimationStates.SLEEP_TO_IDLE,
-            ],
-            images_location=pj(impath, "Sleep", "Sleeping"),
-            frame_timer=1000,
-            repititions=2,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.SLEEP_TO_IDLE: Animation(
-            [AnimationStates.IDLE],
-            images_location=pj(impath, "Sleep", "IdleToSleep"),
-            target_resolution=target_resolution,
-            reverse=True,
-        ),
-        ######### WALKING
-        AnimationStates.WALK_POSITIVE: Animation(
-            standing_actions,
-            images_location=pj(impath, "Walking", "Right"),
-            v_x=3,
-            repititions=7,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.WALK_NEGATIVE: Animation(
-            standing_actions,
-            images_location=pj(impath, "Walking", "Left"),
-            v_x=-3,
-            repititions=7,
-            target_resolution=target_resolution,
-        ),
-        ########## GRAZING
-        AnimationStates.GRAZING_START: Animation(
-            [AnimationStates.GRAZING],
-            images_location=pj(impath, "Grazing", "Transition"),
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.GRAZING_END: Animation(
-            standing_actions,
-            images_location=pj(impath, "Grazing", "Transition"),
-            target_resolution=target_resolution,
-            reverse=True,
-        ),
-        AnimationStates.GRAZING: Animation(
-            [AnimationStates.GRAZING, AnimationStates.GRAZING_END],
-            images_location=pj(impath, "Grazing", "Active"),
-            repititions=1,
-            frame_timer=200,
-            target_resolution=target_resolution,
-        ),
-        ########### MOUSE INTERACTIONS
-        AnimationStates.GRABBED: Animation(
-            [AnimationStates.GRABBED],
-            images_location=pj(impath, "MouseInteractions", "Grabbed"),
-            frame_timer=50,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.GRAB_TO_FALL: Animation(
-            [AnimationStates.FALLING],
-            images_location=pj(impath, "MouseInteractions", "GrabToFall"),
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.FALLING: Animation(
-            [AnimationStates.FALLING],
-            images_location=pj(impath, "MouseInteractions", "Falling"),
-            frame_timer=50,
-            frame_multiplier=2,
-            a_y=1,
-            target_resolution=target_resolution,
-        ),
-        AnimationStates.LANDED: Animation(
-            [AnimationStates.IDLE],
-            images_location=pj(impath, "MouseInteractions", "Landed"),
-            frame_timer=100,
-            target_resolution=target_resolution,
-        ),
-    }
 
-    return animations
+def describe_animations(
+    pet_name: str, target_resolution: Tuple[int, int]
+) -> Dict[AnimationStates, Animation]:
+    """Create the animations of a pet from its definition without loading any of their frames
+    Args:
+        pet_name (str): name of the pet, ie the name of folder its animations are in
+        target_resolution (Tuple[int, int]): target size of the animations
+    Returns:
+        Dict[AnimationStates, Animation]: animations that still have to be loaded, see `load_animations`
+    """
+    definition = load_pet_definition(pet_name)
+    Animation.defer_loading = True
+    try:
+        return definition.create_animations(target_resolution)
+    finally:
+        Animation.defer_loading = False
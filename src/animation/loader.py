@@ -0,0 +1,65 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict
+from src import logger
+from .animation import Animation
+from .animation_states import AnimationStates
+
+
+def load_animations(
+    animations: Dict[AnimationStates, Animation], workers: int = None
+) -> Dict[str, float]:
+    """Load the frames of every animation that is not loaded yet. Decoding and scaling happens
+    in a pool of worker threads (Pillow releases the GIL while it works), and only the creation of
+    the tkinter images happens on the calling thread, which must be the thread running tkinter.
+
+    Args:
+        animations (Dict[AnimationStates, Animation]): animations to load, an animation that is used
+        for several states is only loaded once
+        workers (int, optional): number of worker threads. Defaults to None, one per cpu core
+
+    Returns:
+        Dict[str, float]: seconds it took to load each animation, by animation name
+    """
+    # The same animation can be used by several states (ie the cat's LANDED is its IDLE)
+    pending = []
+    for animation in animations.values():
+        if not animation.is_loaded() and animation not in pending:
+            pending.append(animation)
+    if len(pending) == 0:
+        return {}
+
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pending))
+
+    start = time.perf_counter()
+    load_times: Dict[str, float] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(animation.decode_frames): animation for animation in pending
+        }
+        # Finish each animation on this thread as soon as its frames are decoded
+        for future in as_completed(futures):
+            animation = futures[future]
+            frames = future.result()
+            decode_time = animation.decode_time
+            build_start = time.perf_counter()
+            animation.set_frames(frames)
+            build_time = time.perf_counter() - build_start
+            animation.load_time = decode_time + build_time
+            load_times[animation.name] = animation.load_time
+            logger.info(
+                f"Loaded Animation: {animation.name} in {animation.load_time * 1000:.1f}ms \
+(decode {decode_time * 1000:.1f}ms, tkinter {build_time * 1000:.1f}ms)"
+            )
+
+    # Every animation has its frames now, so the shared scaled source frames are not needed anymore
+    Animation.scaled_frames.clear()
+    for atlas in Animation.sprite_atlases.values():
+        atlas.release()
+    logger.info(
+        f"Loaded {len(pending)} animations with {workers} workers in {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+    return load_times
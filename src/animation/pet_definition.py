@@ -0,0 +1,331 @@
+import json
+import os
+import pathlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from src import logger
+from .animation import Animation
+from .animation_states import AnimationStates
+
+DEFINITION_NAME = "pet.json"
+"""Name of the file in a pet's sprite folder that declares its animations"""
+
+_SOURCE_KEYS = ("gif", "images", "same_as", "mirror_of")
+_NUMBER_KEYS = ("v_x", "v_y", "a_x", "a_y")
+_OTHER_KEYS = ("next", "frame_timer", "frame_multiplier", "repititions", "reverse")
+_ANIMATION_KEYS = _SOURCE_KEYS + _NUMBER_KEYS + _OTHER_KEYS
+
+
+@dataclass(frozen=True)
+class AnimationDefinition:
+    """Everything needed to create the Animation of one state, with paths and states resolved"""
+
+    state: AnimationStates
+    transitions: Tuple[Tuple[AnimationStates, float], ...] = ()
+    """States to go to once the animation ends, with their weights"""
+    gif_location: Optional[str] = None
+    images_location: Optional[str] = None
+    same_as: Optional[AnimationStates] = None
+    """State whose Animation this state plays as well, instead of having its own"""
+    frame_timer: Optional[int] = None
+    frame_multiplier: int = 1
+    repititions: int = 0
+    v_x: float = 0
+    v_y: float = 0
+    a_x: float = 0
+    a_y: float = 0
+    reverse: bool = False
+    mirror: bool = False
+    """Whether or not the frames of the source are flipped horizontally"""
+
+    def create(self, target_resolution: Tuple[int, int]) -> Animation:
+        """Create the Animation this definition describes
+
+        Args:
+            target_resolution (Tuple[int, int]): target size of the animation
+
+        Returns:
+            Animation
+        """
+        return Animation(
+            dict(self.transitions),
+            gif_location=self.gif_location,
+            images_location=self.images_location,
+            frame_timer=self.frame_timer,
+            v_x=self.v_x,
+            v_y=self.v_y,
+            a_x=self.a_x,
+            a_y=self.a_y,
+            repititions=self.repititions,
+            frame_multiplier=self.frame_multiplier,
+            target_resolution=target_resolution,
+            reverse=self.reverse,
+            mirror=self.mirror,
+        )
+
+
+@dataclass(frozen=True)
+class PetDefinition:
+    """The validated animation graph of a pet, as declared in its src/sprites/{pet_name}/pet.json"""
+
+    name: str
+    directory: str
+    """The pet's sprite folder, sources are relative to it"""
+    animations: Tuple[AnimationDefinition, ...]
+
+    def create_animations(
+        self, target_resolution: Tuple[int, int]
+    ) -> Dict[AnimationStates, Animation]:
+        """Create the Animations of every state of the pet, states that are the same as another state
+        share its Animation
+
+        Args:
+            target_resolution (Tuple[int, int]): target size of the animations
+
+        Returns:
+            Dict[AnimationStates, Animation]
+        """
+        animations: Dict[AnimationStates, Animation] = {}
+        for definition in self.animations:
+            if definition.same_as is None:
+                animations[definition.state] = definition.create(target_resolution)
+        for definition in self.animations:
+            if definition.same_as is not None:
+                animations[definition.state] = animations[definition.same_as]
+        return animations
+
+
+_definitions: Dict[str, Tuple[int, PetDefinition]] = {}
+"""Definitions that have been compiled already and the modification time of their file, by path"""
+_definitions_lock = threading.Lock()
+
+
+def get_sprites_directory() -> str:
+    """Folder with the sprite folders of every pet"""
+    return os.path.join(pathlib.Path().resolve(), "src", "sprites")
+
+
+def list_pets() -> List[str]:
+    """Names of every pet that has a definition in the sprites folder
+
+    Returns:
+        List[str]: pet names, sorted alphabetically
+    """
+    sprites = get_sprites_directory()
+    if not os.path.isdir(sprites):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(sprites)
+        if os.path.isfile(os.path.join(sprites, name, DEFINITION_NAME))
+    )
+
+
+def load_pet_definition(pet_name: str) -> PetDefinition:
+    """Read, validate and compile the definition of a pet. Compiled definitions are cached until
+    their file changes
+
+    Args:
+        pet_name (str): name of the pet, ie the name of its folder in src/sprites
+
+    Raises:
+        Exception: when there is no such pet, or its definition is not valid
+
+    Returns:
+        PetDefinition
+    """
+    directory = os.path.join(get_sprites_directory(), pet_name)
+    path = os.path.join(directory, DEFINITION_NAME)
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        raise Exception(
+            f'There is no pet named "{pet_name}", a pet needs a {DEFINITION_NAME} in src/sprites/{pet_name}. \
+Pets that can be used: {", ".join(list_pets()) or "none"}'
+        )
+
+    with _definitions_lock:
+        cached = _definitions.get(path)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+    logger.debug(f"Compiling the definition of {pet_name}")
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except ValueError as e:
+        raise Exception(f"{path} is not valid json: {e}")
+    definition = compile_pet_definition(pet_name, directory, data)
+    with _definitions_lock:
+        _definitions[path] = (modified, definition)
+    return definition
+
+
+def compile_pet_definition(pet_name: str, directory: str, data: dict) -> PetDefinition:
+    """Validate the contents of a pet.json and resolve its states and paths. Every problem with the
+    definition is reported at once
+
+    Args:
+        pet_name (str): name of the pet
+        directory (str): the pet's sprite folder, sources are relative to it
+        data (dict): contents of the pet.json
+
+    Raises:
+        Exception: listing everything that is wrong with the definition
+
+    Returns:
+        PetDefinition
+    """
+    errors: List[str] = []
+    if not isinstance(data, dict) or not isinstance(data.get("animations"), dict):
+        raise Exception(
+            f'The definition of {pet_name} must be an object with an "animations" object'
+        )
+    transitions = data.get("transitions", {})
+    if not isinstance(transitions, dict):
+        errors.append(
+            '"transitions" must be an object of named transitions (lists or weights of states)'
+        )
+        transitions = {}
+    for key in data:
+        if key not in ("animations", "transitions"):
+            errors.append(f'unknown key "{key}"')
+
+    defined = {}
+    for name in data["animations"]:
+        state = AnimationStates.__members__.get(name)
+        if state is None:
+            errors.append(
+                f'"{name}" is not an animation state, expected one of: {", ".join(AnimationStates.__members__)}'
+            )
+        else:
+            defined[name] = state
+
+    def resolve_next(where: str, value) -> Tuple[Tuple[AnimationStates, float], ...]:
+        if isinstance(value, str):
+            if value not in transitions:
+                errors.append(f'{where}: there are no transitions named "{value}"')
+                return ()
+            value = transitions[value]
+        if isinstance(value, list):
+            # A state listed n times has weight n
+            weights = {}
+            for name in value:
+                weights[name] = weights.get(name, 0) + 1
+        elif isinstance(value, dict):
+            weights = value
+        else:
+            weights = {}
+        if len(weights) == 0:
+            errors.append(
+                f"{where}: must be a non empty list of states or an object of states and their weights"
+            )
+            return ()
+        resolved = []
+        for name, weight in weights.items():
+            if name not in defined:
+                errors.append(f'{where}: "{name}" is not one of the pet\'s states')
+            elif type(weight) not in (int, float) or not weight > 0:
+                errors.append(f'{where}: the weight of "{name}" must be a number > 0')
+            else:
+                resolved.append((defined[name], weight))
+        return tuple(resolved)
+
+    animations = []
+    for name, state in defined.items():
+        where = f"animations.{name}"
+        fields = data["animations"][name]
+        if not isinstance(fields, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        for key in fields:
+            if key not in _ANIMATION_KEYS:
+                errors.append(f'{where}: unknown key "{key}"')
+        sources = [key for key in _SOURCE_KEYS if key in fields]
+        if len(sources) != 1:
+            errors.append(
+                f'{where}: needs exactly one of "gif", "images", "same_as" or "mirror_of"'
+            )
+            continue
+
+        if "same_as" in fields:
+            other = fields["same_as"]
+            if other not in defined or "same_as" in data["animations"][other]:
+                errors.append(
+                    f'{where}.same_as: "{other}" must be one of the pet\'s states with its own animation'
+                )
+            elif len(fields) > 1:
+                errors.append(f"{where}: a same_as state can not have other keys")
+            else:
+                animations.append(
+                    AnimationDefinition(state=state, same_as=defined[other])
+                )
+            continue
+
+        kwargs = {}
+        source, source_fields = sources[0], fields
+        if "mirror_of" in fields:
+            # Plays the source of another state flipped, with its own timing and movement
+            other = fields["mirror_of"]
+            other_fields = (
+                data["animations"].get(other) if isinstance(other, str) else None
+            )
+            if not isinstance(other_fields, dict) or not (
+                "gif" in other_fields or "images" in other_fields
+            ):
+                errors.append(
+                    f'{where}.mirror_of: "{other}" must be one of the pet\'s states with its own gif or images'
+                )
+                continue
+            source = "gif" if "gif" in other_fields else "images"
+            source_fields = other_fields
+            kwargs["mirror"] = True
+        location = os.path.join(directory, *str(source_fields[source]).split("/"))
+        if source == "gif":
+            if not os.path.isfile(location):
+                errors.append(f"{where}.gif: {location} does not exist")
+            kwargs["gif_location"] = location
+        else:
+            if not os.path.isdir(location):
+                errors.append(f"{where}.images: {location} is not a folder")
+            kwargs["images_location"] = location
+
+        if "next" not in fields:
+            errors.append(f'{where}: needs "next", the states to go to once it ends')
+        else:
+            kwargs["transitions"] = resolve_next(f"{where}.next", fields["next"])
+        for key in _NUMBER_KEYS:
+            if key in fields:
+                if type(fields[key]) not in (int, float):
+                    errors.append(f"{where}.{key}: must be a number")
+                else:
+                    kwargs[key] = fields[key]
+        for key, minimum in (
+            ("frame_timer", 1),
+            ("frame_multiplier", 1),
+            ("repititions", 0),
+        ):
+            if key in fields:
+                if type(fields[key]) is not int or fields[key] < minimum:
+                    errors.append(f"{where}.{key}: must be a whole number >= {minimum}")
+                else:
+                    kwargs[key] = fields[key]
+        if "reverse" in fields:
+            if type(fields["reverse"]) is not bool:
+                errors.append(f"{where}.reverse: must be true or false")
+            else:
+                kwargs["reverse"] = fields["reverse"]
+        animations.append(AnimationDefinition(state=state, **kwargs))
+
+    # The pets start idle, and a pet that can fall has to be able to land
+    if "IDLE" not in defined:
+        errors.append("IDLE must be defined, every pet starts in it")
+    if "FALLING" in defined and "LANDED" not in defined:
+        errors.append("LANDED must be defined when FALLING is, or the pet can not land")
+
+    if len(errors) > 0:
+        raise Exception(
+            f"The definition of {pet_name} is not valid:\n  " + "\n  ".join(errors)
+        )
+    return PetDefinition(pet_name, directory, tuple(animations))
@@ -0,0 +1,71 @@
+import os
+from typing import List
+from PIL import Image
+from src import logger
+
+ALPHA_THRESHOLD = 128
+"""Pixels with an alpha at or above this become opaque, everything below becomes transparent"""
+_ALPHA_TABLE = [0] * ALPHA_THRESHOLD + [255] * (256 - ALPHA_THRESHOLD)
+
+
+def remove_partial_transparency(image: Image.Image) -> Image.Image:
+    """Force every pixel of an image to be either completly transparent or completly opaque. The
+    alpha band is thresholded with a lookup table in one pass so no pixel is touched from python
+
+    Args:
+        image (Image.Image): image to process, it is not modified
+
+    Returns:
+        Image.Image: RGBA copy of the image with only fully transparent or fully opaque pixels
+    """
+    image = image.convert("RGBA") if image.mode != "RGBA" else image.copy()
+    image.putalpha(image.getchannel("A").point(_ALPHA_TABLE))
+    return image
+
+
+def preprocess_directory(
+    source: str, destination: str, force: bool = False
+) -> List[str]:
+    """Preprocess every png in a sprite directory (and its sub directories), writing the results
+    into the same structure under destination. The source images are never modified, so this can
+    be run as often as needed and files that are already up to date are skipped
+
+    Args:
+        source (str): folder containing the sprites, ie src/sprites/horse
+        destination (str): folder to write the processed sprites to
+        force (bool, optional): process files even if their output is up to date. Defaults to False.
+
+    Returns:
+        List[str]: paths of the files that were written
+    """
+    source = os.path.abspath(source)
+    destination = os.path.abspath(destination)
+    if source == destination:
+        raise Exception(
+            "The preprocessing destination must be different from the source folder"
+        )
+
+    written = []
+    for root, dirs, files in os.walk(source):
+        # Do not walk into the output if it is inside of the source folder
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != destination)
+        for file in sorted(files):
+            if file.split(".").pop().lower() != "png":
+                continue
+            src_path = os.path.join(root, file)
+            dst_path = os.path.join(destination, os.path.relpath(src_path, source))
+            if (
+                not force
+                and os.path.exists(dst_path)
+                and os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+            ):
+                continue
+
+            with Image.open(src_path) as image:
+                processed = remove_partial_transparency(image)
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            processed.save(dst_path, "png")
+            written.append(dst_path)
+
+    logger.info(f"Preprocessed {len(written)} images from {source} into {destination}")
+    return written
@@ -0,0 +1,146 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+from PIL import Image
+
+RESAMPLING_FILTERS = {
+    "nearest": Image.NEAREST,
+    "box": Image.BOX,
+    "bilinear": Image.BILINEAR,
+    "hamming": Image.HAMMING,
+    "bicubic": Image.BICUBIC,
+    "lanczos": Image.LANCZOS,
+}
+"""Resampling filters that can be used to scale frames, by name"""
+
+
+def get_resampling_filter(name: str) -> int:
+    """Look up a resampling filter by its name
+
+    Args:
+        name (str): name of the filter, one of RESAMPLING_FILTERS
+
+    Raises:
+        Exception: when there is no filter with that name
+
+    Returns:
+        int: filter to pass to Image.resize
+    """
+    try:
+        return RESAMPLING_FILTERS[name.lower()]
+    except KeyError:
+        raise Exception(
+            f'Unknown resampling filter "{name}", expected one of: {", ".join(RESAMPLING_FILTERS)}'
+        )
+
+
+def scale_frames(
+    frames: List[Image.Image], target_resolution: Tuple[int, int], resampling: str
+) -> List[Image.Image]:
+    """Resize frames to exactly the target resolution in a single pass
+
+    Args:
+        frames (List[Image.Image]): frames to scale, they are not modified
+        target_resolution (Tuple[int, int]): size of the scaled frames where Tuple[0] is x width and Tuple[1] is y width
+        resampling (str): name of the resampling filter, see RESAMPLING_FILTERS
+
+    Returns:
+        List[Image.Image]: the scaled frames, a frame that already has the right size is returned as is
+    """
+    resample = get_resampling_filter(resampling)
+    size = (int(target_resolution[0]), int(target_resolution[1]))
+    scaled = []
+    for frame in frames:
+        if frame.size != size:
+            duration = frame.info.get("duration")
+            frame = frame.resize(size, resample)
+            if duration is not None:
+                frame.info["duration"] = duration
+        scaled.append(frame)
+    return scaled
+
+
+class ScaledFrameCache:
+    """In memory cache of the decoded and scaled frames of every source file, so animations that use
+    the same gif or image (ie the cat's GRABBED and WALK_POSITIVE) only decode and scale it once.
+
+    Entries are keyed by the file, its modification time and the settings used to produce the frames.
+    When several threads ask for the same entry at once only one of them does the work, the others
+    wait for its result. The least recently used entries are dropped once the cached frames take up
+    more than max_bytes.
+    """
+
+    max_bytes: int
+    """Most bytes of pixel data to keep in the cache"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int, optional): Most bytes of pixel data to keep in the cache. Defaults to 64MB.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        path: str,
+        settings: tuple,
+        produce: Callable[[str], List[Image.Image]],
+    ) -> List[Image.Image]:
+        """Get the frames of a source file, producing them if they are not cached
+
+        Args:
+            path (str): the source file
+            settings (tuple): everything else that changes how the frames look, ie the target
+            resolution and resampling filter
+            produce (Callable[[str], List[Image.Image]]): decodes and scales the frames of path
+
+        Returns:
+            List[Image.Image]: the frames, the list is a copy but the frames are shared so they must not be modified
+        """
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns, settings)
+        with self._lock:
+            future = self._entries.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._entries[key] = future
+            else:
+                self._entries.move_to_end(key)
+
+        if is_owner:
+            try:
+                frames = produce(path)
+            except BaseException as e:
+                with self._lock:
+                    self._entries.pop(key, None)
+                future.set_exception(e)
+                raise
+            future.set_result(frames)
+            self._trim()
+        return list(future.result())
+
+    def clear(self):
+        """Drop every cached frame"""
+        with self._lock:
+            self._entries.clear()
+
+    def _trim(self):
+        """Drop the least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            sizes = {
+                key: sum(
+                    f.width * f.height * len(f.getbands()) for f in future.result()
+                )
+                for key, future in self._entries.items()
+                if future.done() and future.exception() is None
+            }
+            used = sum(sizes.values())
+            for key in list(sizes):
+                if used <= self.max_bytes:
+                    break
+                used -= sizes[key]
+                del self._entries[key]
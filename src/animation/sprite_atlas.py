@@ -0,0 +1,277 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from src import logger
+
+
+class SpriteAtlas:
+    """All of the frames of a pet packed into a single image, next to an index of where every frame is.
+
+    The frames are packed after they are decoded, preprocessed and scaled, so loading a pet from its
+    atlas is one read of the index and one read (memory mapped where possible) of the atlas image,
+    after which the frames are cut out of it. An atlas is only used when it was packed with the same
+    resolution, resampling filter and preprocessing the pet is loaded with.
+
+    Sources (gifs or folders of images) are stored by their path relative to the pet's sprite folder,
+    with a fingerprint of the contents of their files when they were packed. A source whose files
+    changed since is not taken from the atlas, so it is decoded again instead. The fingerprint only
+    depends on the paths relative to the sprite folder and the bytes of the files, so an atlas still
+    matches after the sprite folder is copied or moved (ie unpacked by a pyinstaller build).
+    The index also describes the animation states of the pet and their timings, for tools that want
+    to inspect a packed pet.
+    """
+
+    FORMAT_VERSION = 3
+    """Bump whenever the layout of the atlas or its index changes"""
+    IMAGE_NAME = "atlas.png"
+    INDEX_NAME = "atlas.json"
+    MAX_WIDTH = 4096
+    """Widest the atlas image is allowed to be in px"""
+
+    directory: str
+    """The pet's sprite folder the atlas belongs to"""
+    index: dict
+    """Contents of the atlas index"""
+
+    def __init__(self, directory: str, index: dict):
+        """
+        Args:
+            directory (str): the pet's sprite folder, ie src/sprites/horse
+            index (dict): contents of the atlas index, see `SpriteAtlas.pack`
+        """
+        self.directory = os.path.abspath(directory)
+        self.index = index
+        self._image: Optional[Image.Image] = None
+        self._lock = threading.Lock()
+        # Whether or not the files of a source are the ones that were packed, by its key
+        self._checked: Dict[str, bool] = {}
+
+    @property
+    def image_path(self) -> str:
+        return os.path.join(self.directory, SpriteAtlas.IMAGE_NAME)
+
+    @staticmethod
+    def open(directory: str) -> Optional["SpriteAtlas"]:
+        """Read the atlas index of a pet's sprite folder. The atlas image is only read once frames are needed
+
+        Args:
+            directory (str): the pet's sprite folder
+
+        Returns:
+            Optional[SpriteAtlas]: the atlas, or None if the folder has no (readable) atlas
+        """
+        try:
+            with open(os.path.join(directory, SpriteAtlas.INDEX_NAME), "r") as f:
+                index = json.load(f)
+        except OSError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring corrupt sprite atlas in {directory}: {e}")
+            return None
+        if index.get("version") != SpriteAtlas.FORMAT_VERSION:
+            logger.warning(
+                f"Ignoring sprite atlas in {directory} made by another version, pack it again"
+            )
+            return None
+        return SpriteAtlas(directory, index)
+
+    def matches(
+        self, target_resolution: Tuple[int, int], resampling: str, preprocessing: bool
+    ) -> bool:
+        """Whether or not the atlas was packed with the given settings
+
+        Args:
+            target_resolution (Tuple[int, int]): resolution the frames are scaled to
+            resampling (str): name of the filter the frames are scaled with
+            preprocessing (bool): whether or not partial transparency is removed from the frames
+
+        Returns:
+            bool
+        """
+        return (
+            tuple(self.index["resolution"]) == tuple(target_resolution)
+            and self.index["resampling"] == resampling
+            and self.index["preprocessing"] == bool(preprocessing)
+        )
+
+    def has_source(self, source: str, files: List[str]) -> bool:
+        """Whether or not the frames of a gif or folder of images are in the atlas, and its files did not
+        change since they were packed. The files are only checked the first time
+
+        Args:
+            source (str): absolute path of the gif or folder
+            files (List[str]): the files the source is decoded from, see `Animation.source_files`
+
+        Returns:
+            bool
+        """
+        key = self._key(source)
+        if key not in self.index["sources"]:
+            return False
+        with self._lock:
+            matches = self._checked.get(key)
+        if matches is None:
+            matches = self.index["fingerprints"].get(key) == self.fingerprint(files)
+            if not matches:
+                logger.warning(
+                    f"{key} changed since the sprite atlas in {self.directory} was packed, decoding it instead"
+                )
+            with self._lock:
+                self._checked[key] = matches
+        return matches
+
+    def fingerprint(self, files: List[str]) -> str:
+        """Hash of the paths (relative to the sprite folder) and the contents of files
+
+        Args:
+            files (List[str]): the files a source is decoded from
+
+        Returns:
+            str: hex digest
+        """
+        digest = hashlib.sha1()
+        for path in files:
+            digest.update(f"{self._key(path)};".encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def frames(self, source: str) -> List[Image.Image]:
+        """Cut the frames of a source out of the atlas. Safe to call from several threads
+
+        Args:
+            source (str): absolute path of the gif or folder, see `SpriteAtlas.has_source`
+
+        Returns:
+            List[Image.Image]: RGBA frames, their "duration" info is how long the gif shows them for
+        """
+        image = self._load_image()
+        frames = []
+        for rect in self.index["sources"][self._key(source)]:
+            x, y, width, height = rect["rect"]
+            frame = image.crop((x, y, x + width, y + height))
+            if rect.get("duration"):
+                frame.info["duration"] = rect["duration"]
+            frames.append(frame)
+        return frames
+
+    def release(self):
+        """Forget the decoded atlas image, it is read again the next time frames are needed"""
+        with self._lock:
+            self._image = None
+
+    def _load_image(self) -> Image.Image:
+        with self._lock:
+            if self._image is None:
+                with open(self.image_path, "rb") as f:
+                    try:
+                        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    except (OSError, ValueError):
+                        # Not every file can be mapped, ie empty files or some network drives
+                        data = None
+                    if data is not None:
+                        with data, Image.open(data) as image:
+                            self._image = image.convert("RGBA")
+                    else:
+                        with Image.open(f) as image:
+                            self._image = image.convert("RGBA")
+            return self._image
+
+    def _key(self, source: str) -> str:
+        return os.path.relpath(os.path.abspath(source), self.directory).replace(
+            os.sep, "/"
+        )
+
+    @staticmethod
+    def pack(
+        directory: str,
+        sources: Dict[str, List[Image.Image]],
+        files: Dict[str, List[str]],
+        states: Dict[str, dict],
+        target_resolution: Tuple[int, int],
+        resampling: str,
+        preprocessing: bool,
+    ) -> "SpriteAtlas":
+        """Pack frames into an atlas image and write it and its index to the pet's sprite folder
+
+        Args:
+            directory (str): the pet's sprite folder
+            sources (Dict[str, List[Image.Image]]): frames of every gif or folder of images, by their
+            absolute path. The frames must already be preprocessed and scaled
+            files (Dict[str, List[str]]): the files every source is decoded from, by its absolute path
+            states (Dict[str, dict]): description of every animation state, by name
+            target_resolution (Tuple[int, int]): resolution the frames were scaled to
+            resampling (str): name of the filter the frames were scaled with
+            preprocessing (bool): whether or not partial transparency was removed from the frames
+
+        Returns:
+            SpriteAtlas: the new atlas
+        """
+        atlas = SpriteAtlas(
+            directory,
+            {
+                "version": SpriteAtlas.FORMAT_VERSION,
+                "resolution": list(target_resolution),
+                "resampling": resampling,
+                "preprocessing": bool(preprocessing),
+                "sources": {},
+                "fingerprints": {},
+                "states": states,
+            },
+        )
+
+        # Shelf packing: fill rows left to right, starting a new row when one is full
+        frames = [frame for source in sources.values() for frame in source]
+        if len(frames) == 0:
+            raise Exception(f"There are no frames to pack for {directory}")
+        widest = max(frame.width for frame in frames)
+        row_width = max(
+            widest,
+            min(
+                SpriteAtlas.MAX_WIDTH,
+                widest * math.ceil(math.sqrt(len(frames))),
+            ),
+        )
+        x = y = row_height = width = 0
+        for source, source_frames in sources.items():
+            rects = []
+            for frame in source_frames:
+                if x + frame.width > row_width:
+                    x, y, row_height = 0, y + row_height, 0
+                rects.append(
+                    {
+                        "rect": [x, y, frame.width, frame.height],
+                        "duration": int(frame.info.get("duration") or 0),
+                    }
+                )
+                x += frame.width
+                width = max(width, x)
+                row_height = max(row_height, frame.height)
+            atlas.index["sources"][atlas._key(source)] = rects
+            atlas.index["fingerprints"][atlas._key(source)] = atlas.fingerprint(
+                files[source]
+            )
+
+        image = Image.new("RGBA", (width, y + row_height), (0, 0, 0, 0))
+        for source, source_frames in sources.items():
+            for frame, rect in zip(
+                source_frames, atlas.index["sources"][atlas._key(source)]
+            ):
+                image.paste(frame.convert("RGBA"), tuple(rect["rect"][:2]))
+
+        # Write to temporary files first so a failed pack never leaves a half written atlas behind
+        index_path = os.path.join(atlas.directory, SpriteAtlas.INDEX_NAME)
+        image.save(atlas.image_path + ".tmp", format="PNG")
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(atlas.index, f)
+        os.replace(atlas.image_path + ".tmp", atlas.image_path)
+        os.replace(index_path + ".tmp", index_path)
+        logger.info(
+            f"Packed {len(frames)} frames of {directory} into a {image.width}x{image.height} atlas"
+        )
+        return atlas
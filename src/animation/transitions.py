@@ -0,0 +1,101 @@
+import random
+from typing import Dict, List, Tuple, Union
+from .animation_states import AnimationStates
+
+
+class TransitionTable:
+    """Weighted choice of the state to go to once an animation ends.
+
+    The weights are turned into an alias table (Vose's method) when the table is made, so every pick
+    takes one random number and constant time no matter how many states there are.
+    """
+
+    states: Tuple[AnimationStates, ...]
+    """States that can be picked, in the order they were given"""
+    weights: Tuple[float, ...]
+    """Weight of each of the states"""
+
+    def __init__(self, weights: Dict[AnimationStates, float]):
+        """
+        Args:
+            weights (Dict[AnimationStates, float]): how likely each state is to be picked, relative to the others
+
+        Raises:
+            Exception: when there are no states or a weight is not positive
+        """
+        if len(weights) == 0:
+            raise Exception("A transition table needs at least one state")
+        for state, weight in weights.items():
+            if not weight > 0:
+                raise Exception(
+                    f"The weight of {state} must be more than 0, got {weight}"
+                )
+        self.states = tuple(weights.keys())
+        self.weights = tuple(float(weight) for weight in weights.values())
+
+        count = len(self.states)
+        total = sum(self.weights)
+        scaled = [weight * count / total for weight in self.weights]
+        self._probability = [1.0] * count
+        self._alias = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._probability[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Whatever is left over is 1 up to rounding errors
+
+    @staticmethod
+    def from_states(
+        states: Union[List[AnimationStates], Dict[AnimationStates, float]]
+    ) -> "TransitionTable":
+        """Make a table from weights, or from a list of states where a state listed n times has weight n
+
+        Args:
+            states (Union[List[AnimationStates], Dict[AnimationStates, float]])
+
+        Returns:
+            TransitionTable
+        """
+        if isinstance(states, dict):
+            return TransitionTable(states)
+        weights: Dict[AnimationStates, float] = {}
+        for state in states:
+            weights[state] = weights.get(state, 0) + 1
+        return TransitionTable(weights)
+
+    def pick(self, rng: random.Random = None) -> AnimationStates:
+        """Pick a state
+
+        Args:
+            rng (random.Random, optional): random number generator to use. Defaults to None, the global one.
+
+        Returns:
+            AnimationStates
+        """
+        if len(self.states) == 1:
+            return self.states[0]
+        # Split one number in [0, n) into the column and the coin flip within the column
+        roll = (rng or random).random() * len(self.states)
+        column = int(roll)
+        if roll - column < self._probability[column]:
+            return self.states[column]
+        return self.states[self._alias[column]]
+
+    def probabilities(self) -> Dict[AnimationStates, float]:
+        """Chance of picking each of the states
+
+        Returns:
+            Dict[AnimationStates, float]: probabilities that add up to 1
+        """
+        total = sum(self.weights)
+        return {
+            state: weight / total for state, weight in zip(self.states, self.weights)
+        }
+
+    def __repr__(self):
+        return f"<TransitionTable: {', '.join(f'{s.name} {p:.0%}' for s, p in self.probabilities().items())}>"
@@ -1,94 +1,287 @@
-import tkinter as tk
-from xml.etree.ElementTree import XML
-from screeninfo import get_monitors
-from xml.dom import minidom
-import distutils.util
-from src import logger
-import pathlib
+import logging
 import os
-from typing import Tuple
+import pathlib
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from src import logger
+
+_TRUE = ("y", "yes", "t", "true", "on", "1")
+_FALSE = ("n", "no", "f", "false", "off", "0")
+_REQUIRED = object()
 
 
+@dataclass(frozen=True)
 class PetConfiguration:
+    """Settings of one of the pets in the config.xml"""
+
+    name: str
     offset: int
+    """Offset from the bottom of the screen in px"""
     bg_color: str
+    """Background color that is keyed out to make the window transparent"""
     target_resolution: Tuple[int, int]
+    """Size the pet's frames are scaled to"""
 
-    def __init__(self, offset, bg_color, target_resolution):
-        self.offset = offset
-        self.bg_color = bg_color
-        self.target_resolution = target_resolution
 
+@dataclass(frozen=True)
+class Configuration:
+    """Everything in the config.xml, parsed and checked once. See the config.xml for what each setting does"""
 
-class XMLReader:
     path: str
-    """
-    Path to the xml data store
-    """
-    dom: minidom
-
-    def __init__(self, path=None, dom=None):
-        if dom is None:
-            if path is None:
-                path = os.path.join(pathlib.Path().resolve(), "config.xml")
-            self.path = path
-            self.dom = minidom.parse(path)
-        else:
-            self.path = path
-            self.dom = dom
-
-    def getDefaultPet(self):
-        return self.getFirstTagValue("defualt_pet")
-
-    def getForceTopMostWindow(self):
-        return self.getFirstTagValueAsBool("force_topmost")
-
-    def getShouldRunAnimationPreprocessing(self):
-        return self.getFirstTagValueAsBool("should_run_preprocessing")
-
-    def getMatchingPetConfigurationAsDom(self, pet: str) -> minidom:
-        pets = self.dom.getElementsByTagName("pet")
-        pet_config = None
-        for i in range(len(pets)):
-            if pets[i].getAttribute("name") == pet:
-                pet_config = pets[i]
-        if pet_config is None:
+    """Path of the config.xml this was read from"""
+    default_pet: str
+    pet_count: int
+    random_seed: Optional[int]
+    force_topmost: bool
+    should_run_preprocessing: bool
+    resampling: str
+    loading_workers: int
+    lazy_loading: bool
+    frame_memory_budget: Optional[int]
+    """Most bytes of frames to keep loaded when lazy loading, None if there is no limit"""
+    physics_step: float
+    batch_physics: bool
+    power_saving: bool
+    cpu_budget: Optional[float]
+    """Most part (0 to 1) of the time the updates of the pets may take, None if there is no limit"""
+    hot_reload: bool
+    log_level: int
+    """Level of the program's logger, ie logging.INFO"""
+    trace_ticks: int
+    """How many ticks the tracer keeps a record of, 0 if it records none"""
+    metrics_interval: float
+    """Seconds between writes of the metrics report, 0 if metrics are not collected"""
+    pets: Mapping[str, PetConfiguration]
+    """Settings of every pet, by name"""
+
+    def pet(self, name: str) -> PetConfiguration:
+        """Settings of a pet
+
+        Args:
+            name (str): name of the pet
+
+        Raises:
+            Exception: when the config.xml has no pet with that name
+
+        Returns:
+            PetConfiguration
+        """
+        try:
+            return self.pets[name]
+        except KeyError:
             raise Exception(
-                "Could not find the current pet as one of \
-                the supported pets in the config.xml. 'current_pet' must \
-                match one of the 'pet' element's 'name' attribute"
+                f'There is no pet named "{name}" in {self.path}, it must match the name attribute of one of the pet \
+elements: {", ".join(self.pets)}'
             )
-        return pet_config
-
-    def getMatchingPetConfigurationClean(self, pet: str) -> PetConfiguration:
-        pet_config = self.getMatchingPetConfigurationAsDom(pet)
-        pet_reader = XMLReader(dom=pet_config)
-        offset = int(pet_reader.getFirstTagValue("offset"))
-        bg_color = pet_reader.getFirstTagValue("bg_color")
-        resolution = XMLReader(dom=pet_config.getElementsByTagName("resolution")[0])
-        target_resolution = (
-            int(resolution.getFirstTagValue("x")),
-            int(resolution.getFirstTagValue("y")),
+
+
+_configurations: Dict[str, Tuple[int, Configuration]] = {}
+"""Configurations that have been read already and the modification time of their file, by path"""
+_lock = threading.Lock()
+
+
+def default_config_path() -> str:
+    """Path of the config.xml in the current working directory"""
+    return os.path.join(pathlib.Path().resolve(), "config.xml")
+
+
+def load_config(path: str = None) -> Configuration:
+    """Read and check a config.xml. The result is cached until the file changes
+
+    Args:
+        path (str, optional): Path of the config.xml. Defaults to None, the config.xml in the current working directory.
+
+    Raises:
+        Exception: listing every problem with the config.xml
+
+    Returns:
+        Configuration
+    """
+    path = os.path.abspath(path or default_config_path())
+    modified = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _configurations.get(path)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+    logger.debug(f"Reading the configuration from {path}")
+    try:
+        root = ET.parse(path).getroot()
+    except ET.ParseError as e:
+        raise Exception(f"{path} is not valid xml: {e}")
+    configuration = parse_config(root, path)
+    with _lock:
+        _configurations[path] = (modified, configuration)
+    return configuration
+
+
+def parse_config(root: ET.Element, path: str) -> Configuration:
+    """Turn the root element of a config.xml into a Configuration, checking every value
+
+    Args:
+        root (ET.Element): the config element
+        path (str): path of the config.xml, used in error messages
+
+    Raises:
+        Exception: listing every problem with the configuration at once
+
+    Returns:
+        Configuration
+    """
+    errors: List[str] = []
+
+    def value(
+        element: ET.Element,
+        tag: str,
+        convert: Callable[[str], Any],
+        default: Any = _REQUIRED,
+        where: str = "",
+    ) -> Any:
+        child = element.find(tag)
+        text = child.text.strip() if child is not None and child.text else ""
+        if text == "":
+            if default is _REQUIRED:
+                errors.append(f"{where}<{tag}> is missing")
+            return None if default is _REQUIRED else default
+        try:
+            return convert(text)
+        except ValueError as e:
+            errors.append(f"{where}<{tag}> has an invalid value: {e}")
+            return None if default is _REQUIRED else default
+
+    def at_least(minimum: float, kind: Callable[[str], Any]) -> Callable[[str], Any]:
+        def convert(text: str):
+            number = kind(text)
+            if number < minimum:
+                raise ValueError(f"must be at least {minimum}, got {text}")
+            return number
+
+        return convert
+
+    pets: Dict[str, PetConfiguration] = {}
+    pets_element = root.find("pets")
+    for element in pets_element.findall("pet") if pets_element is not None else []:
+        name = element.get("name")
+        if not name:
+            errors.append("a <pet> has no name attribute")
+            continue
+        if name in pets:
+            errors.append(f'there is more than one <pet name="{name}">')
+            continue
+        where = f'<pet name="{name}"> '
+        resolution = element.find("resolution")
+        if resolution is None:
+            errors.append(f"{where}<resolution> is missing")
+            resolution = ET.Element("resolution")
+        pets[name] = PetConfiguration(
+            name=name,
+            offset=value(element, "offset", int, where=where),
+            bg_color=value(element, "bg_color", str, where=where),
+            target_resolution=(
+                value(resolution, "x", at_least(1, int), where=where + "<resolution> "),
+                value(resolution, "y", at_least(1, int), where=where + "<resolution> "),
+            ),
         )
+    if len(pets) == 0:
+        errors.append("there are no <pet> elements in <pets>")
+
+    default_pet = value(root, "defualt_pet", str)
+    if default_pet is not None and len(pets) > 0 and default_pet not in pets:
+        errors.append(
+            f'<defualt_pet> "{default_pet}" is not one of the pets: {", ".join(pets)}'
+        )
+    budget_mb = value(root, "frame_memory_budget_mb", at_least(0, float), 0)
+    cpu_budget = value(root, "cpu_budget_percent", at_least(0, float), 0)
+
+    configuration = Configuration(
+        path=path,
+        default_pet=default_pet,
+        pet_count=value(root, "pet_count", at_least(1, int), 1),
+        random_seed=value(root, "random_seed", int, None),
+        force_topmost=value(root, "force_topmost", parse_bool),
+        should_run_preprocessing=value(root, "should_run_preprocessing", parse_bool),
+        resampling=value(root, "resampling", str.lower, "nearest"),
+        loading_workers=value(root, "loading_workers", at_least(0, int), 0),
+        lazy_loading=value(root, "lazy_loading", parse_bool, False),
+        frame_memory_budget=int(budget_mb * 1024 * 1024) if budget_mb > 0 else None,
+        physics_step=value(root, "physics_step_ms", at_least(0.1, float), 10.0),
+        batch_physics=value(root, "batch_physics", parse_bool, False),
+        power_saving=value(root, "power_saving", parse_bool, False),
+        cpu_budget=cpu_budget / 100 if cpu_budget > 0 else None,
+        hot_reload=value(root, "hot_reload", parse_bool, False),
+        log_level=value(root, "log_level", parse_log_level, logging.INFO),
+        trace_ticks=value(root, "trace_ticks", at_least(0, int), 0),
+        metrics_interval=value(root, "metrics_interval", at_least(0, float), 0.0),
+        pets=MappingProxyType(pets),
+    )
+    if len(errors) > 0:
+        raise Exception(f"{path} is not valid:\n  " + "\n  ".join(errors))
+    return configuration
 
-        return PetConfiguration(offset, bg_color, target_resolution)
 
-    def getFirstTagValueAsBool(self, tag_name: str) -> bool:
-        return XMLReader.xml_bool(self.getFirstTagValue(tag_name))
+def update_config(values: Dict[str, Any], path: str = None) -> Configuration:
+    """Change top level settings in a config.xml, keeping its comments. The file is replaced in one step
+    so it is never left half written
 
-    def getFirstTagValue(self, tag_name: str) -> str:
-        return self.dom.getElementsByTagName(tag_name)[0].firstChild.nodeValue
+    Args:
+        values (Dict[str, Any]): new values by tag name, ie {"should_run_preprocessing": True}
+        path (str, optional): Path of the config.xml. Defaults to None, the config.xml in the current working directory.
 
-    def setFirstTagValue(self, tag_name: str, val: any):
-        self.dom.getElementsByTagName(tag_name)[0].firstChild.replaceWholeText(val)
+    Returns:
+        Configuration: the updated configuration
+    """
+    path = os.path.abspath(path or default_config_path())
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    tree = ET.parse(path, parser)
+    root = tree.getroot()
+    for tag, new_value in values.items():
+        element = root.find(tag)
+        if element is None:
+            element = ET.SubElement(root, tag)
+        if isinstance(new_value, bool):
+            new_value = "true" if new_value else "false"
+        element.text = "" if new_value is None else str(new_value)
+    # Check the new values before anything is written
+    configuration = parse_config(root, path)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        tree.write(tmp, encoding="utf-8", xml_declaration=True)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    with _lock:
+        _configurations[path] = (os.stat(path).st_mtime_ns, configuration)
+    return configuration
 
-    def save(self, path: str = None):
-        if path is None:
-            path = self.path
 
-        with open(self.path, "w") as f:
-            f.write(self.dom.toxml())
+def parse_log_level(text: str) -> int:
+    """Read the name of a logging level, ie "debug"
 
-    @staticmethod
-    def xml_bool(val: str) -> bool:
-        return bool(distutils.util.strtobool(val))
+    Raises:
+        ValueError: when text is not a level
+    """
+    level = logging.getLevelName(text.upper())
+    if not isinstance(level, int):
+        raise ValueError(
+            f'must be one of debug, info, warning, error or critical, got "{text}"'
+        )
+    return level
+
+
+def parse_bool(text: str) -> bool:
+    """Read a true/false setting, accepts the same values as the old distutils strtobool
+
+    Raises:
+        ValueError: when text is not a boolean
+    """
+    text = text.lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f'must be true or false, got "{text}"')
@@ -0,0 +1,347 @@
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from PIL import Image
+from src import logger
+from .animation import Animation, AnimationStates, FrameResidency, load_pet_definition
+from .animation.load_animations import describe_animations
+from .animation.pet_definition import DEFINITION_NAME
+from .animation.sprite_atlas import SpriteAtlas
+from .config_reader import Configuration, load_config
+from .pets import Scheduler
+
+_UNSETTLED_STATES = (
+    AnimationStates.GRABBED,
+    AnimationStates.GRAB_TO_FALL,
+    AnimationStates.FALLING,
+)
+"""States in which a pet is not standing on the floor, so reloading does not move it"""
+_LIVE_SETTINGS = (
+    "resampling",
+    "should_run_preprocessing",
+    "frame_memory_budget",
+    "power_saving",
+    "cpu_budget",
+)
+"""Top level settings of the config.xml that are applied without restarting"""
+
+
+class HotReloader:
+    """Watches the config.xml and the sprite folder of a pet, and swaps the changes into the running
+    pets without restarting them.
+
+    A background thread polls the modification times of the files. When something changed only the
+    animations whose definition, settings or source files changed are rebuilt, and their frames are
+    decoded on that background thread. Handing the frames to tkinter and swapping the animations into
+    the animators happens on the scheduler's thread between two ticks (see `Scheduler.call_soon`), so
+    the pets keep their position and keep playing their current state. A reload that fails (ie a typo
+    in the pet.json) is logged and the pets keep running with what they had.
+    """
+
+    scheduler: Scheduler
+    pet_name: str
+    animations: Dict[AnimationStates, Animation]
+    """The animations the pets play, updated in place"""
+    config: Configuration
+    """The configuration that was read last"""
+    residency: FrameResidency
+    """Decides which animations are loaded when lazy loading, None otherwise"""
+    interval: float
+    """Seconds between checks for changed files"""
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        pet_name: str,
+        animations: Dict[AnimationStates, Animation],
+        config: Configuration,
+        residency: FrameResidency = None,
+        interval: float = 1.0,
+    ):
+        """
+        Args:
+            scheduler (Scheduler): scheduler driving the pets, the changes are applied on its thread
+            pet_name (str): name of the pet being shown
+            animations (Dict[AnimationStates, Animation]): the animations the pets play
+            config (Configuration): the configuration the pets were started with
+            residency (FrameResidency, optional): residency of the animations when lazy loading. Defaults to None.
+            interval (float, optional): seconds between checks for changed files. Defaults to 1.0.
+        """
+        self.scheduler = scheduler
+        self.pet_name = pet_name
+        self.animations = animations
+        self.config = config
+        self.residency = residency
+        self.interval = interval
+        self.directory = load_pet_definition(pet_name).directory
+        self._snapshot = self.snapshot()
+        # Changed files of reloads that failed, retried with the next change
+        self._pending: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def start(self):
+        """Start watching for changes in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="HotReloader", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching for changes"""
+        self._stop.set()
+        self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Hot reloading failed, keeping the current animations")
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Modification time and size of the config.xml and every file in the pet's sprite folder
+
+        Returns:
+            Dict[str, Tuple[int, int]]: by absolute path
+        """
+        files = [self.config.path]
+        for folder, _, names in os.walk(self.directory):
+            for name in names:
+                # Packed atlases are made from the sprites, they are not a change to them
+                if name not in (SpriteAtlas.IMAGE_NAME, SpriteAtlas.INDEX_NAME):
+                    files.append(os.path.join(folder, name))
+        snapshot = {}
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def check(self) -> bool:
+        """Look for changed files once and reload what they affect. Called by the watching thread, but
+        can be called directly (ie when driving the scheduler by hand)
+
+        Returns:
+            bool: whether or not something changed and a reload was handed to the scheduler
+        """
+        snapshot = self.snapshot()
+        changed = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        } | self._pending
+        self._snapshot = snapshot
+        if len(changed) == 0:
+            return False
+        # Kept until the reload is handed to the scheduler, so fixing a typo in the pet.json also
+        # reloads the sprites that were saved along with it
+        self._pending = changed
+        logger.info(f"Reloading {self.pet_name}, changed: {', '.join(sorted(changed))}")
+        try:
+            config = load_config(self.config.path)
+            pet_config = config.pet(self.pet_name)
+            load_pet_definition(self.pet_name)
+        except Exception as e:
+            # Wait for the next change, the file may be half saved
+            logger.error(f"Not reloading {self.pet_name}: {e}")
+            return False
+
+        previous, self.config = self.config, config
+        settings_changed = (
+            config.resampling != previous.resampling
+            or config.should_run_preprocessing != previous.should_run_preprocessing
+        )
+        sprites_changed = any(
+            path != config.path and os.path.basename(path) != DEFINITION_NAME
+            for path in changed
+        )
+        # Frames cut out of an atlas would be the old frames or made with the old settings
+        atlas_outdated = settings_changed or sprites_changed
+        # The pets keep decoding with the class level settings and atlases until the reload is applied,
+        # so the new ones are only handed to the decoding here
+        atlases = [
+            atlas
+            for directory, atlas in list(Animation.sprite_atlases.items())
+            if not (atlas_outdated and directory == self.directory)
+        ]
+
+        animations = describe_animations(self.pet_name, pet_config.target_resolution)
+        rebuilt = self._keep_unchanged(animations, changed, settings_changed)
+        decoded: Dict[Animation, List[Image.Image]] = {}
+        for animation in rebuilt:
+            # Only decode what was loaded before, lazy pets load the rest when they need it
+            old = rebuilt[animation]
+            if self.residency is None or (old is not None and old.is_loaded()):
+                decoded[animation] = animation.decode_frames(
+                    resampling=config.resampling,
+                    preprocessing=config.should_run_preprocessing,
+                    atlases=atlases,
+                )
+        logger.info(f"Rebuilt {len(rebuilt)} animations of {self.pet_name}")
+        self.scheduler.call_soon(
+            lambda: self.apply(previous, config, animations, decoded, atlas_outdated)
+        )
+        self._pending = set()
+        return True
+
+    def _keep_unchanged(
+        self,
+        animations: Dict[AnimationStates, Animation],
+        changed: Set[str],
+        settings_changed: bool,
+    ) -> Dict[Animation, Optional[Animation]]:
+        """Put the current animations back into the new set of animations wherever nothing about them
+        changed, so they do not have to be loaded again
+
+        Args:
+            animations (Dict[AnimationStates, Animation]): newly described animations, updated in place
+            changed (Set[str]): paths of the files that changed
+            settings_changed (bool): whether or not the frames have to be made with other settings
+
+        Returns:
+            Dict[Animation, Optional[Animation]]: the animations that were rebuilt, with the animation each
+            replaces (None for new states)
+        """
+        rebuilt: Dict[Animation, Optional[Animation]] = {}
+        kept: Dict[Animation, Animation] = {}
+        for state, animation in animations.items():
+            if animation in kept:
+                animations[state] = kept[animation]
+                continue
+            if animation in rebuilt:
+                continue
+            old = self.animations.get(state)
+            if (
+                old is not None
+                and not settings_changed
+                and _signature(old) == _signature(animation)
+                and not any(_uses_file(old, path) for path in changed)
+            ):
+                kept[animation] = old
+                animations[state] = old
+            else:
+                rebuilt[animation] = old
+        return rebuilt
+
+    def apply(
+        self,
+        previous: Configuration,
+        config: Configuration,
+        animations: Dict[AnimationStates, Animation],
+        decoded: Dict[Animation, List[Image.Image]],
+        atlas_outdated: bool = False,
+    ):
+        """Swap a reload into the running pets, must be called on the scheduler's thread
+
+        Args:
+            previous (Configuration): the configuration the pets were running with
+            config (Configuration): the new configuration
+            animations (Dict[AnimationStates, Animation]): the new animations
+            decoded (Dict[Animation, List[Image.Image]]): frames decoded for the new animations
+            atlas_outdated (bool, optional): whether or not the pet's sprite atlas no longer matches its
+            sprites or settings. Defaults to False.
+        """
+        if (
+            atlas_outdated
+            and Animation.sprite_atlases.pop(self.directory, None) is not None
+        ):
+            logger.warning(
+                f"The sprite atlas of {self.pet_name} is out of date, run `python -m src.animation pack {self.pet_name}` to update it"
+            )
+        # Animations loaded from now on (ie by lazy pets) are made with the new settings
+        Animation.should_run_preprocessing = config.should_run_preprocessing
+        Animation.resampling = config.resampling
+        Animation.scaled_frames.clear()
+        for animation, frames in decoded.items():
+            animation.set_frames(frames)
+        replacements = {
+            old: animations[state]
+            for state, old in self.animations.items()
+            if state in animations and animations[state] is not old
+        }
+        # The pets, the residency and the animation cache all share this dictionary
+        self.animations.clear()
+        self.animations.update(animations)
+        if self.residency is not None:
+            for old, new in replacements.items():
+                self.residency.replace(old, new)
+            self.residency.memory_budget = config.frame_memory_budget
+        self.scheduler.power_saving = config.power_saving
+        self.scheduler.cpu_budget = config.cpu_budget
+
+        old_pet_config = previous.pet(self.pet_name)
+        pet_config = config.pet(self.pet_name)
+        pets = [
+            pet
+            for pet in self.scheduler.pets
+            if pet.animator.animations is self.animations
+        ]
+        offset_change = old_pet_config.offset - pet_config.offset
+        moved_floors = []
+        for pet in pets:
+            resolution = pet.canvas.resolution
+            if offset_change != 0 and not any(r is resolution for r in moved_floors):
+                # Pets usually share one resolution, only move its floor once
+                resolution["height"] += offset_change
+                moved_floors.append(resolution)
+            if pet_config.bg_color != old_pet_config.bg_color:
+                pet.canvas.set_background(pet_config.bg_color)
+            pet.animator.replace_animations(replacements)
+            if pet.animator.state not in _UNSETTLED_STATES:
+                # The pet may have changed size, keep it standing on the floor
+                size = pet.get_current_animation().target_resolution
+                pet.y = resolution["height"] - size[1]
+                if getattr(pet, "physics", None) is not None:
+                    pet.physics.set_position(pet.physics_index, pet.x, pet.y)
+                if hasattr(pet, "reset_movement"):
+                    pet.reset_movement()
+            pet.canvas.invalidate()
+        # Nothing plays the old animations anymore, let go of the frames only they used
+        for old in replacements:
+            old.unload()
+
+        restart = [
+            name
+            for name in Configuration.__dataclass_fields__
+            if name not in _LIVE_SETTINGS + ("path", "pets")
+            and getattr(config, name) != getattr(previous, name)
+        ]
+        if len(restart) > 0:
+            logger.warning(
+                f"Restart the pet to apply the changes to: {', '.join(restart)}"
+            )
+        logger.info(f"Reloaded {self.pet_name}")
+
+
+def _signature(animation: Animation) -> tuple:
+    """Everything that went into making an animation, besides its source files"""
+    return (
+        animation.gif_location,
+        animation.images_location,
+        animation.reverse,
+        animation.mirror,
+        animation.frame_duration,
+        animation.frame_multiplier,
+        animation.frame_timer,
+        animation.repititions,
+        animation.v_x,
+        animation.v_y,
+        animation.a_x,
+        animation.a_y,
+        animation.transitions.states,
+        animation.transitions.weights,
+        tuple(animation.target_resolution),
+    )
+
+
+def _uses_file(animation: Animation, path: str) -> bool:
+    """Whether or not an animation is made from a file, or a file in its images folder"""
+    if animation.gif_location is not None:
+        return os.path.abspath(animation.gif_location) == path
+    return os.path.dirname(path) == os.path.abspath(animation.images_location)
@@ -1,81 +1,159 @@
 import tkinter as tk
-from PIL import Image
-from .animation import AnimationStates, Animator, get_animations
-from src.pets import Pet
-from screeninfo import get_monitors
-from xml.dom import minidom
-import distutils.util
+from .animation import AnimationStates, Animator, FrameResidency, get_animations
+from src.pets import Metrics, Pet, Scheduler
 from src import logger
-import pathlib
-import os
-from .window_utils import configure_window, show_window
-from .config_reader import XMLReader
+from .window_utils import Tray, configure_window, show_window
+from .config_reader import load_config
+from .startup import StartupReport
+from .tracing import tracer
 
+METRICS_REPORT = "metrics.json"
+"""File the metrics are written to when metrics_interval is set in the config"""
 
-def start_program(current_pet: str = None):
-    """Creates a window and pet from the configuration xml and then shows that pet
+
+def start_program(
+    current_pet: str = None,
+    pet_count: int = None,
+    startup: StartupReport = None,
+    report_startup: bool = False,
+):
+    """Creates a window for every pet from the configuration xml and then shows those pets. All of the
+    pets share one tkinter root, one copy of the animations and one scheduler
+
+    Modules that are only needed for some features (the tray icon, hot reloading) are imported when
+    the feature is first used, to keep the time until the pets show up short.
 
     Args:
-        current_pet (str, optional): [description]. Defaults to None.
+        current_pet (str, optional): name of the pet to show. Defaults to None, the default pet in the config.
+        pet_count (int, optional): how many pets to show. Defaults to None, the pet_count in the config.
+        startup (StartupReport, optional): report to time the phases of starting up into, ie one that
+        already timed the imports. Defaults to None, a new report.
+        report_startup (bool, optional): print the startup report once the first frame is shown, then
+        exit. Defaults to False.
 
     Raises:
         Exception: [description]
     """
+    if startup is None:
+        startup = StartupReport()
     logger.debug("Loading general configuration from XML")
     ### General Configuration
-    config = XMLReader()
-    current_pet = config.getDefaultPet() if current_pet is None else current_pet
-    topmost = config.getForceTopMostWindow()
-    should_run_preprocessing = config.getShouldRunAnimationPreprocessing()
+    config = load_config()
+    logger.setLevel(config.log_level)
+    tracer.configure(ticks=config.trace_ticks)
+    current_pet = config.default_pet if current_pet is None else current_pet
+    pet_count = config.pet_count if pet_count is None else pet_count
+    topmost = config.force_topmost
+    should_run_preprocessing = config.should_run_preprocessing
+    loading_workers = config.loading_workers
+    lazy_loading = config.lazy_loading
 
     ### Animation Specific Configuration
     # Find the desired pet
     logger.debug('Finding "current_pet" configurations from the XML')
-    pet_config = config.getMatchingPetConfigurationClean(current_pet)
+    pet_config = config.pet(current_pet)
+    startup.mark("config")
 
     ### Window Configuration
     logger.debug("Creating tkinter window/config")
     # Get info on the primary monitor (that is where the pet will be)
+    from screeninfo import get_monitors
+
     monitor = get_monitors()[0]
     resolution = {
         "width": int(monitor.width),
         "height": int(monitor.height - pet_config.offset),
     }
-    window = tk.Tk()
-    canvas = configure_window(
-        window, topmost=topmost, bg_color=pet_config.bg_color, resolution=resolution
-    )
+    startup.mark("monitor query")
+    # Every pet gets its own window, the root window is only there to own them
+    root = tk.Tk()
+    root.withdraw()
+    startup.mark("tkinter")
 
     ## Load the animations.
     logger.debug("Starting to load animations")
     animations = get_animations(
-        current_pet, pet_config.target_resolution, should_run_preprocessing
+        current_pet,
+        pet_config.target_resolution,
+        should_run_preprocessing,
+        workers=loading_workers,
+        lazy=lazy_loading,
+        resampling=config.resampling,
+    )
+    residency = (
+        FrameResidency(animations, config.frame_memory_budget) if lazy_loading else None
     )
+    startup.mark("animation load")
 
-    animator = Animator(
-        state=AnimationStates.IDLE, frame_number=0, animations=animations
+    ## Initialize pets
+    # Create the desktop pets, spread out along the bottom of the screen
+    logger.debug(f"Create {pet_count} pets")
+    metrics = Metrics() if config.metrics_interval > 0 else None
+    scheduler = Scheduler(
+        root,
+        physics_step=config.physics_step,
+        batch_physics=config.batch_physics,
+        metrics=metrics,
+        report_path=METRICS_REPORT if metrics is not None else None,
+        report_interval=config.metrics_interval,
+        power_saving=config.power_saving,
+        cpu_budget=config.cpu_budget,
     )
+    # Closing a pet's window puts the pets away in the tray
+    tray = Tray(scheduler)
+    seed = config.random_seed
+    pets = []
+    for i in range(pet_count):
+        canvas = configure_window(
+            tk.Toplevel(root),
+            topmost=topmost,
+            bg_color=pet_config.bg_color,
+            resolution=resolution,
+            on_close=tray.hide,
+        )
+        animator = Animator(
+            state=AnimationStates.IDLE,
+            frame_number=0,
+            animations=animations,
+            lazy=lazy_loading,
+            residency=residency,
+            seed=seed + i if seed is not None else None,
+        )
+        x = int(canvas.resolution["width"] * (i + 1) / (pet_count + 1))
+        y = int(canvas.resolution["height"])
+        pet = Pet(x, y, canvas=canvas, animator=animator)
+        # bind key events to the pet
+        canvas.label.bind("<ButtonPress-1>", pet.start_move)
+        canvas.label.bind("<ButtonRelease-1>", pet.stop_move)
+        canvas.label.bind("<B1-Motion>", pet.do_move)
+        # Grabbing or letting go of a pet shows right away, even if the loop sleeps in power saving mode
+        canvas.label.bind("<ButtonPress-1>", lambda event: scheduler.wake(), add="+")
+        canvas.label.bind("<ButtonRelease-1>", lambda event: scheduler.wake(), add="+")
+        logger.info(pet.__repr__())
+        scheduler.add_pet(pet)
+        pets.append(pet)
+    startup.mark("window setup")
+
+    if config.hot_reload:
+        from .hot_reload import HotReloader
 
-    # We esentially only need to run preprocessing once as it is really expensive to do
-    # so make it false for the next time the program runs
-    if should_run_preprocessing:
-        config.setFirstTagValue("should_run_preprocessing", "false")
-        config.save()
+        logger.debug(f"Watching the configuration and the sprites of {current_pet}")
+        HotReloader(scheduler, current_pet, animations, config, residency).start()
 
-    ## Initialize pet
-    # Create the desktop pet
-    logger.debug("Create pet")
-    x = int(canvas.resolution["width"] / 2)
-    y = int(canvas.resolution["height"])
-    pet = Pet(x, y, canvas=canvas, animator=animator)
-    # bind key events to the pet and start the app
-    canvas.label.bind("<ButtonPress-1>", pet.start_move)
-    canvas.label.bind("<ButtonRelease-1>", pet.stop_move)
-    canvas.label.bind("<B1-Motion>", pet.do_move)
-    logger.info(pet.__repr__())
+    def first_frame_shown():
+        startup.mark("first frame")
+        logger.info(f"Showed the first frame {startup.total():.0f}ms after starting")
+        if report_startup:
+            print(startup)
+            root.destroy()
 
     # Begin the main loop
-    window.after(1, pet.on_tick)
-    show_window(window)
-    window.mainloop()
-    return pet
+    scheduler.start()
+    for pet in pets:
+        show_window(pet.canvas.window)
+    # The first tick draws the pets, tkinter puts the frames on the screen once it is idle after that
+    root.after(0, lambda: root.after_idle(first_frame_shown))
+    root.mainloop()
+    if metrics is not None:
+        scheduler.write_report()
+    return pets
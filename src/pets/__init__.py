@@ -1 +1,5 @@
 from .interactable_pet import InteractablePet as Pet
+from .scheduler import Scheduler
+from .render_backend import RenderBackend, NullBackend
+from .physics import PhysicsWorld
+from .metrics import Metrics, Histogram
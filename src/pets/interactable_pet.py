@@ -1,14 +1,14 @@
-import tkinter as tk
-
+from collections import deque
+from typing import Tuple
 from ..animation import Animation, AnimationStates, Animator
-from ..window_utils import Canvas
+from .physics import PhysicsWorld
 from .simple_pet import SimplePet
 from src import logger
 
 # ! IMPORTANT:
 # ! NOTE: in order to have the pet fall after being grabbed, there must be key value pair in its animator.animations dict for
 # ! AnimationStates.FALLING, and then for the falling animation to end there must be an animation for AnimationStates.LANDED.
-# ! See the example in src.animations.get_cat_animations where although not having gif files for falling and landing animations
+# ! See the example in src/sprites/cat/pet.json where although not having gif files for falling and landing animations
 # ! other animations are repurposed for these animation states.
 class InteractablePet(SimplePet):
     """Represents a Virtual Desktop Pet that has animations, basic physics, can be picked up, and will stay on screen.
@@ -16,72 +16,215 @@ class InteractablePet(SimplePet):
     """
 
     v_x: float = 0
+    """change in x in px per ms"""
     v_y: float = 0
+    """change in y in px per ms"""
     a_x: float = 0
+    """change in v_x in px per ms per ms"""
     a_y: float = 0
+    """change in v_y in px per ms per ms"""
+    physics: PhysicsWorld = None
+    """World moving this pet together with other pets, None if the pet moves itself"""
+    physics_index: int = None
+    """Index of this pet in its physics world"""
+    dragging: bool = False
+    """Whether or not the pet is held by the mouse"""
+    throw_v_x: float = 0
+    """change in x in px per ms the pet was let go with, it keeps it once it starts FALLING"""
+    throw_v_y: float = 0
+    """change in y in px per ms the pet was let go with, it keeps it once it starts FALLING"""
+
+    DRAG_INTERVAL = 16
+    """ms between updates while the pet is dragged, so it follows the mouse at about 60 frames per second"""
+    DRAG_VELOCITY_WINDOW = 100
+    """ms of mouse movement before the pet is let go that the velocity it is thrown with is measured over"""
+    MAX_THROW_SPEED = 2.0
+    """Fastest the pet can be thrown in either direction, in px per ms"""
 
     def __init__(self, x, y, canvas, animator):
         super().__init__(x, y, canvas, animator)
+        # Latest position of the mouse dragging the pet that has not been applied yet
+        self._pointer: Tuple[int, int] = None
+        # Time (of the event, in ms), x and y of the last mouse movements while dragging
+        self._drag_samples = deque(maxlen=16)
+
+    def attach_physics(self, world: PhysicsWorld):
+        """Let a physics world move this pet, instead of moving itself in `update`
+
+        Args:
+            world (PhysicsWorld)
+        """
+        self.physics = world
+        self.physics_index = world.add(self)
+        self.physics.set_position(self.physics_index, self.x, self.y)
+        self.reset_movement()
 
     def reset_movement(self):
         """Resets the movement information for the pet based on the current animation"""
         animation = self.get_current_animation()
-        self.v_x, self.v_y = animation.get_velocity()
-        self.a_x, self.a_y = animation.get_acceleration()
+        # Animations give their movement per frame_timer, convert it to be per ms so that movement
+        # does not depend on how often the pet is updated
+        timer = animation.frame_timer
+        v_x, v_y = animation.get_velocity()
+        a_x, a_y = animation.get_acceleration()
+        self.v_x, self.v_y = v_x / timer, v_y / timer
+        self.a_x, self.a_y = a_x / timer**2, a_y / timer**2
+        if self.animator.state == AnimationStates.FALLING and (
+            self.throw_v_x != 0 or self.throw_v_y != 0
+        ):
+            # Keep the momentum the pet was thrown with
+            self.v_x += self.throw_v_x
+            self.v_y += self.throw_v_y
+            self.throw_v_x, self.throw_v_y = 0, 0
+        if self.physics is not None:
+            self.physics.set_movement(
+                self.physics_index,
+                self.v_x,
+                self.v_y,
+                self.a_x,
+                self.a_y,
+                animation.target_resolution,
+                self.animator.state == AnimationStates.FALLING,
+            )
 
-    def do_movement(self):
-        """Keep the pet on the screen and if the pet is in the air, then make the pet fall down to the "floor" """
-        # Update Position and Velocity
-        self.v_x += self.a_x
-        self.v_y += self.a_y
-        self.x = int(self.x + self.v_x)
-        self.y = int(self.y + self.v_y)
+    def do_movement(self, elapsed: float = None):
+        """Keep the pet on the screen and if the pet is in the air, then make the pet fall down to the "floor"
 
-        logger.debug(
-            f"Pet Anim/Movement: accel:({self.a_x}, {self.a_y}), vel:({self.v_x}, {self.v_y}), posn:({self.x}, {self.y}) anim:{self.get_current_animation().a_y}"
-        )
+        Args:
+            elapsed (float, optional): ms of time to move for. Defaults to None, the frame_timer of the current
+            animation
+        """
+        if elapsed is None:
+            elapsed = self.get_current_animation().frame_timer
+        # Update Position and Velocity
+        self.v_x += self.a_x * elapsed
+        self.v_y += self.a_y * elapsed
+        self.x = self.x + self.v_x * elapsed
+        self.y = self.y + self.v_y * elapsed
 
         # check and move x to be on screen
         size = self.animator.animations[self.animator.state].target_resolution
+        on_edge = False
         if self.x < 0:
             self.x = size[0]
+            on_edge = True
         if self.x > self.canvas.resolution["width"] - size[0]:
             self.x = self.canvas.resolution["width"] - size[0]
+            on_edge = True
+        if self.animator.state == AnimationStates.FALLING:
+            # A thrown pet stops at the sides and the top of the screen
+            if on_edge:
+                self.v_x = 0
+            if self.y < 0:
+                self.y = 0
+                self.v_y = max(self.v_y, 0)
 
         # do stuff with the y position
         # to make sure the pet falls to ground and is not off the bottom of the screen
         if self.y > self.canvas.resolution["height"] - size[1]:
             self.y = self.canvas.resolution["height"] - size[1]
             if self.animator.state == AnimationStates.FALLING:
-                if AnimationStates.LANDED in self.animator.animations:
-                    self.set_animation_state(AnimationStates.LANDED)
-                else:
-                    raise Exception(
-                        "Stuck falling as no AnimationStates.LANDED is defined\
-                        so the animation handler does not know how to transition out of the falling state! \
-                        Define AnimationStates.LANDED to resolve this error."
-                    )
-
-    def update(self):
-        """Move the pet according to the animation and physics as well as progressing to the next frame of the animation"""
-        self.do_movement()
-        super().update()
-
-    def on_tick(self):
-        """Draw the current animation"""
-        self.update()
-        frame = super().get_curent_animation_frame()
-        super().set_geometry()
-        self.canvas.label.configure(image=frame)
-        self.canvas.window.after(1, self.handle_event)
+                self.land()
+
+    def land(self):
+        """The pet was falling and hit the floor"""
+        if AnimationStates.LANDED in self.animator.animations:
+            self.set_animation_state(AnimationStates.LANDED)
+        else:
+            raise Exception(
+                "Stuck falling as no AnimationStates.LANDED is defined\
+                so the animation handler does not know how to transition out of the falling state! \
+                Define AnimationStates.LANDED to resolve this error."
+            )
+
+    def update(self, elapsed: float = None):
+        """Move the pet according to the animation and physics as well as progressing the animation
+
+        Args:
+            elapsed (float, optional): ms of time to progress by. Defaults to None, the frame_timer of the
+            current animation
+        """
+        # Pets in a physics world are moved by the world
+        if self.physics is None:
+            self.do_movement(elapsed)
+        super().update(elapsed)
+
+    def update_interval(self) -> float:
+        """ms until the pet needs to be updated again, at most DRAG_INTERVAL while it is dragged so it
+        follows the mouse smoothly
+
+        Returns:
+            float
+        """
+        interval = super().update_interval()
+        if self.dragging:
+            return min(interval, InteractablePet.DRAG_INTERVAL)
+        return interval
+
+    def is_static(self) -> bool:
+        """Whether or not the pet stays where it is, it is not dragged and does not move by itself
+
+        Returns:
+            bool
+        """
+        return (
+            not self.dragging
+            and self.v_x == 0
+            and self.v_y == 0
+            and self.a_x == 0
+            and self.a_y == 0
+        )
+
+    def render(self):
+        """Move the pet to where it was dragged to, then move the window to the pet and show its current frame"""
+        if self._pointer is not None:
+            self.apply_drag()
+        super().render()
+
+    def apply_drag(self):
+        """Move the pet to the latest position of the mouse dragging it"""
+        size = self.get_current_animation().target_resolution
+        # Center the pet on the mouse rather than putting its top left corner there
+        self.x = self._pointer[0] - int(size[0] / 2)
+        self.y = self._pointer[1] - int(size[1] / 2)
+        self._pointer = None
+        if self.physics is not None:
+            self.physics.set_position(self.physics_index, self.x, self.y)
+
+    def drag_velocity(self, time: int) -> Tuple[float, float]:
+        """Velocity of the mouse over the last DRAG_VELOCITY_WINDOW ms of the drag
+
+        Args:
+            time (int): time of the event (in ms) that ends the drag, ie the release of the mouse button
+
+        Returns:
+            Tuple[float, float]: change in x and y in px per ms, 0 if the mouse was held still. At most
+            MAX_THROW_SPEED in either direction
+        """
+        window = InteractablePet.DRAG_VELOCITY_WINDOW
+        samples = [
+            sample for sample in self._drag_samples if time - sample[0] <= window
+        ]
+        if len(samples) < 2 or samples[-1][0] <= samples[0][0]:
+            return 0.0, 0.0
+        elapsed = samples[-1][0] - samples[0][0]
+        limit = InteractablePet.MAX_THROW_SPEED
+        return tuple(
+            max(-limit, min(limit, (samples[-1][i] - samples[0][i]) / elapsed))
+            for i in (1, 2)
+        )
 
     def __repr__(self):
         size = self.animator.animations[self.animator.state].target_resolution
-        return f"<VirtualPet of {size[0]}x{size[1]} at ({self.x}, {self.y}) using {str(self.animator)} and {str(self.canvas)}>"
+        return f"<VirtualPet of {size[0]}x{size[1]} at ({int(self.x)}, {int(self.y)}) using {str(self.animator)} and {str(self.canvas)}>"
 
     #################################################### Event Handlers
     def start_move(self, event):
         """Mouse 1 click"""
+        self.dragging = True
+        self.throw_v_x, self.throw_v_y = 0, 0
+        self._drag_samples.clear()
+        self._drag_samples.append((event.time, event.x_root, event.y_root))
         # Try to visually indicate that the pet has been grabbed, but only
         # if the animation exists
         if AnimationStates.GRABBED in self.animator.animations:
@@ -89,12 +232,17 @@ class InteractablePet(SimplePet):
 
     def stop_move(self, event):
         """Mouse 1 release"""
+        self.dragging = False
+        if self._pointer is not None:
+            self.apply_drag()
         # to transfer out of the falling state, there has to be a landed state. Do not go into the falling state unless
         # landed state and falling state are defined
         if (
             AnimationStates.FALLING in self.animator.animations
             and AnimationStates.LANDED in self.animator.animations
         ):
+            # Throw the pet with the speed it was let go with, it falls with it
+            self.throw_v_x, self.throw_v_y = self.drag_velocity(event.time)
             # if transition animation, try to use it
             if AnimationStates.GRAB_TO_FALL in self.animator.animations:
                 self.set_animation_state(AnimationStates.GRAB_TO_FALL)
@@ -108,13 +256,8 @@ class InteractablePet(SimplePet):
             self.set_animation_state(AnimationStates.IDLE)
 
     def do_move(self, event):
-        """Mouse movement while clicked"""
-        # Get the resolution of the current animation
-        size = self.animator.animations[self.animator.state].target_resolution
-
-        # Get the location on the desktop (root) and center the transform in the
-        # center of the frame (rather than the default top left corner)
-        self.x = event.x_root - int(size[0] / 2)
-        self.y = event.y_root - int(size[1] / 2)
-        # Relocate the window on the screen to match
-        self.set_geometry()
+        """Mouse movement while clicked. The mouse can report movement far more often than the pet is
+        drawn, so this only keeps the latest position of the mouse (on the desktop), `render` moves the
+        pet and its window there once per update"""
+        self._pointer = (event.x_root, event.y_root)
+        self._drag_samples.append((event.time, event.x_root, event.y_root))
@@ -0,0 +1,211 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import List, Tuple
+
+
+class Histogram:
+    """Counts of measurements (in ms) in fixed buckets, so recording one is cheap and takes no memory.
+    Percentiles are estimated from the buckets, as the upper bound of the bucket they fall in (or the
+    largest measurement, if that is smaller)
+    """
+
+    BOUNDS: Tuple[float, ...] = (
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2,
+        4,
+        8,
+        16,
+        33,
+        66,
+        100,
+        250,
+        500,
+        1000,
+    )
+    """Upper bounds (inclusive) of the buckets in ms, the last bucket holds everything above them"""
+
+    counts: List[int]
+    count: int
+    total: float
+    maximum: float
+
+    def __init__(self):
+        self.counts = [0] * (len(Histogram.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, value: float):
+        """Add a measurement
+
+        Args:
+            value (float): ms
+        """
+        self.counts[bisect_left(Histogram.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate the value below which a fraction of the measurements are
+
+        Args:
+            fraction (float): ie 0.99 for the 99th percentile
+
+        Returns:
+            float: ms, 0 if there are no measurements
+        """
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count > 0:
+                if i == len(Histogram.BOUNDS):
+                    return self.maximum
+                return min(Histogram.BOUNDS[i], self.maximum)
+        return self.maximum
+
+    def summary(self) -> dict:
+        """The histogram as something that can be written as json
+
+        Returns:
+            dict: count, mean, p50, p90, p99 and max in ms, and the count in every bucket by its upper bound
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.maximum,
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(Histogram.BOUNDS + ("inf",), self.counts)
+                if count > 0
+            },
+        }
+
+
+class Metrics:
+    """Timings of the update loop and of the calls to the window manager, collected while the pets run.
+
+    Give it to a `Scheduler` to measure how long every tick takes and how late every loop comes back
+    compared to when the animations asked for it (jitter). A loop that comes back a whole update late
+    or more dropped the frames it missed. The scheduler also hands it to the render backends of its
+    pets, which then time their geometry and frame calls.
+    """
+
+    ticks: Histogram
+    """ms spent in every tick"""
+    lateness: Histogram
+    """ms every loop came back later than requested"""
+    geometry_calls: Histogram
+    """ms spent moving and resizing windows"""
+    frame_calls: Histogram
+    """ms spent showing frames in windows"""
+    jitter_total: float
+    """Sum of how many ms every loop came back earlier or later than requested"""
+    dropped_frames: int
+    """Updates that were missed because the loop came back late"""
+    wakeups: int
+    """Times the loop woke up, including while the pets were paused"""
+    throttled: int
+    """Times the loop was slowed down to stay within the cpu budget of the scheduler"""
+    started: float
+    """time.time() of when collecting started"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything that was collected"""
+        self.ticks = Histogram()
+        self.lateness = Histogram()
+        self.geometry_calls = Histogram()
+        self.frame_calls = Histogram()
+        self.dropped_frames = 0
+        self.wakeups = 0
+        self.throttled = 0
+        self.jitter_total = 0.0
+        self.started = time.time()
+
+    def record_interval(self, requested: float, actual: float):
+        """Record how long the loop took to come back
+
+        Args:
+            requested (float): ms the loop asked to wait for, ie the frame_timer of the fastest animation
+            actual (float): ms it actually took
+        """
+        jitter = actual - requested
+        self.jitter_total += abs(jitter)
+        self.lateness.record(max(0.0, jitter))
+        if jitter >= requested > 0:
+            self.dropped_frames += int(jitter // requested)
+
+    def report(self, pets: list = ()) -> dict:
+        """Everything collected so far, as something that can be written as json
+
+        Args:
+            pets (list, optional): pets whose animations to report the load times of. Defaults to ().
+
+        Returns:
+            dict
+        """
+        animations = {}
+        for pet in pets:
+            for state, animation in pet.animator.animations.items():
+                if animation.name in animations:
+                    continue
+                animations[animation.name] = {
+                    "state": state.name,
+                    "loaded": animation.is_loaded(),
+                    "frames": len(animation.frames),
+                    "bytes": animation.memory_size,
+                    "load_ms": _ms(animation.load_time),
+                    "decode_ms": _ms(animation.decode_time),
+                }
+        seconds = time.time() - self.started
+        return {
+            "time": time.time(),
+            "seconds": seconds,
+            "wakeups": self.wakeups,
+            "wakeups_per_second": self.wakeups / seconds if seconds > 0 else 0.0,
+            "throttled": self.throttled,
+            "ticks": self.ticks.summary(),
+            "lateness": self.lateness.summary(),
+            "mean_jitter": (
+                self.jitter_total / self.lateness.count
+                if self.lateness.count > 0
+                else 0.0
+            ),
+            "dropped_frames": self.dropped_frames,
+            "geometry_calls": self.geometry_calls.summary(),
+            "frame_calls": self.frame_calls.summary(),
+            "animations": animations,
+        }
+
+    @staticmethod
+    def write_report(path: str, report: dict):
+        """Write a report to a json file, replacing it in one step so readers never see half of it
+
+        Args:
+            path (str): file to write
+            report (dict): report to write, see `Metrics.report`
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp, path)
+
+
+def _ms(seconds: float) -> float:
+    return seconds * 1000 if seconds is not None else None
@@ -0,0 +1,157 @@
+from typing import Dict
+
+np = None
+"""numpy, only imported once a PhysicsWorld is needed as it is slow to import"""
+
+
+def _import_numpy() -> bool:
+    """Import numpy if it was not imported yet
+
+    Returns:
+        bool: whether or not numpy is installed
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            # numpy is optional, pets fall back to moving themselves one at a time
+            return False
+        np = numpy
+    return True
+
+
+class PhysicsWorld:
+    """Moves many pets at once. The position, velocity, acceleration and size of every pet is kept
+    in numpy arrays (a struct of arrays) and every physics step integrates all of the pets with a few
+    array operations. Keeping pets on screen and landing falling pets is done with masks over the
+    arrays, so the only per pet python work left is for the pets that actually land.
+
+    The arrays are the source of truth for attached pets, pets push changes in with `set_movement` and
+    `set_position`, and `sync` writes the positions and velocities back to the pets before drawing.
+    """
+
+    FIELDS = ("x", "y", "v_x", "v_y", "a_x", "a_y", "width", "height")
+
+    pets: list
+    """Attached pets, a pet's index in this list is its index in the arrays"""
+    resolution: Dict[str, int]
+    """size of the area the pets can move in, must have "width" and "height" as keys"""
+
+    def __init__(self, resolution: Dict[str, int]):
+        """
+        Args:
+            resolution (Dict[str, int]): must have "width" and "height" as keys
+        """
+        if not _import_numpy():
+            raise Exception("numpy is needed to move pets with a PhysicsWorld")
+        self.resolution = resolution
+        self.pets = []
+        self.arrays = {name: np.zeros(0) for name in PhysicsWorld.FIELDS}
+        self.falling = np.zeros(0, dtype=bool)
+
+    @staticmethod
+    def available() -> bool:
+        """Whether or not numpy is installed, which a PhysicsWorld needs
+
+        Returns:
+            bool
+        """
+        return _import_numpy()
+
+    def add(self, pet) -> int:
+        """Start moving a pet with this world
+
+        Args:
+            pet (InteractablePet): pet to move
+
+        Returns:
+            int: index of the pet in the arrays
+        """
+        index = len(self.pets)
+        self.pets.append(pet)
+        for name in PhysicsWorld.FIELDS:
+            self.arrays[name] = np.append(self.arrays[name], 0.0)
+        self.falling = np.append(self.falling, False)
+        return index
+
+    def set_position(self, index: int, x: float, y: float):
+        """Move a pet, ie when it is dragged by the mouse"""
+        self.arrays["x"][index] = x
+        self.arrays["y"][index] = y
+
+    def set_movement(
+        self,
+        index: int,
+        v_x: float,
+        v_y: float,
+        a_x: float,
+        a_y: float,
+        size: tuple,
+        falling: bool,
+    ):
+        """Update a pet's movement, ie when its animation changed
+
+        Args:
+            index (int): index of the pet
+            v_x (float): change in x in px per ms
+            v_y (float): change in y in px per ms
+            a_x (float): change in v_x in px per ms per ms
+            a_y (float): change in v_y in px per ms per ms
+            size (tuple): width and height of the pet
+            falling (bool): whether or not the pet lands when it hits the floor
+        """
+        arrays = self.arrays
+        arrays["v_x"][index] = v_x
+        arrays["v_y"][index] = v_y
+        arrays["a_x"][index] = a_x
+        arrays["a_y"][index] = a_y
+        arrays["width"][index] = size[0]
+        arrays["height"][index] = size[1]
+        self.falling[index] = falling
+
+    def step(self, elapsed: float):
+        """Move every pet for elapsed ms, keep them on screen and land the falling pets that hit the floor
+
+        Args:
+            elapsed (float): ms of time to move for
+        """
+        arrays = self.arrays
+        x, y = arrays["x"], arrays["y"]
+        v_x, v_y = arrays["v_x"], arrays["v_y"]
+        width, height = arrays["width"], arrays["height"]
+
+        v_x += arrays["a_x"] * elapsed
+        v_y += arrays["a_y"] * elapsed
+        x += v_x * elapsed
+        y += v_y * elapsed
+
+        # Keep x on screen
+        left = x < 0
+        np.copyto(x, width, where=left)
+        right = self.resolution["width"] - width
+        past_right = x > right
+        np.copyto(x, right, where=past_right)
+        # A thrown pet stops at the sides and the top of the screen
+        np.copyto(v_x, 0.0, where=(left | past_right) & self.falling)
+        above = (y < 0) & self.falling
+        np.copyto(y, 0.0, where=above)
+        np.copyto(v_y, 0.0, where=above & (v_y < 0))
+
+        # Keep the pets above the floor, and land the falling ones that reached it
+        floor = self.resolution["height"] - height
+        below = y > floor
+        np.copyto(y, floor, where=below)
+        landed = np.flatnonzero(below & self.falling)
+        for index in landed.tolist():
+            self.pets[index].land()
+
+    def sync(self):
+        """Write the positions and velocities of the arrays back to the pets"""
+        arrays = self.arrays
+        columns = [arrays[name].tolist() for name in ("x", "y", "v_x", "v_y")]
+        for pet, x, y, v_x, v_y in zip(self.pets, *columns):
+            pet.x = x
+            pet.y = y
+            pet.v_x = v_x
+            pet.v_y = v_y
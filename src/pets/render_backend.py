@@ -0,0 +1,127 @@
+import time
+from typing import Any, Dict
+from .metrics import Metrics
+
+
+class RenderBackend:
+    """Everything a pet needs to show itself on the screen. Pets only draw through this, so the same
+    pet logic can run against a tkinter window or headless (see `NullBackend`)
+
+    Talking to the window manager is the most expensive part of a pet's update, so the backend
+    remembers the last geometry and frame it applied and skips calls that would not change anything.
+    Subclasses only implement `apply_geometry` and `apply_frame`.
+    """
+
+    resolution: Dict[str, int]
+    """size of the area the pet can move in, must have "width" and "height" as keys"""
+    suppressed_geometry_calls: int
+    """How many set_geometry calls were skipped as the geometry did not change"""
+    suppressed_frame_calls: int
+    """How many show_frame calls were skipped as the frame did not change"""
+    metrics: Metrics
+    """Times the geometry and frame calls that are applied, None to not time them"""
+
+    def __init__(self, resolution: Dict[str, int]):
+        """
+        Args:
+            resolution (Dict[str, int]): must have "width" and "height" as keys
+        """
+        self.resolution = resolution
+        self.suppressed_geometry_calls = 0
+        self.suppressed_frame_calls = 0
+        self.metrics = None
+        self._geometry = None
+        self._frame = None
+
+    def set_geometry(self, width: int, height: int, x: int, y: int):
+        """Move and resize the pet's window, if it is not there already
+
+        Args:
+            width (int): width of the window in px
+            height (int): height of the window in px
+            x (int): x position of the top left corner
+            y (int): y position of the top left corner
+        """
+        geometry = (width, height, x, y)
+        if geometry == self._geometry:
+            self.suppressed_geometry_calls += 1
+            return
+        self._geometry = geometry
+        if self.metrics is None:
+            self.apply_geometry(width, height, x, y)
+            return
+        start = time.perf_counter()
+        self.apply_geometry(width, height, x, y)
+        self.metrics.geometry_calls.record((time.perf_counter() - start) * 1000)
+
+    def show_frame(self, frame: Any):
+        """Show a frame of an animation in the pet's window, if it is not shown already
+
+        Args:
+            frame (Any): frame made by the `Animation.frame_factory` used with this backend
+        """
+        if frame is self._frame:
+            self.suppressed_frame_calls += 1
+            return
+        self._frame = frame
+        if self.metrics is None:
+            self.apply_frame(frame)
+            return
+        start = time.perf_counter()
+        self.apply_frame(frame)
+        self.metrics.frame_calls.record((time.perf_counter() - start) * 1000)
+
+    def invalidate(self):
+        """Forget what was applied last, so the next geometry and frame are always applied. Use this
+        when the window was changed behind the backend's back, ie after it was hidden"""
+        self._geometry = None
+        self._frame = None
+
+    def set_background(self, color: str):
+        """Change the background color that is keyed out to make the pet's window transparent. Does
+        nothing for backends without a background
+
+        Args:
+            color (str): tkinter color, ie "#ff0000"
+        """
+
+    def apply_geometry(self, width: int, height: int, x: int, y: int):
+        """Actually move and resize the pet's window, see `RenderBackend.set_geometry`"""
+        raise NotImplementedError()
+
+    def apply_frame(self, frame: Any):
+        """Actually show a frame in the pet's window, see `RenderBackend.show_frame`"""
+        raise NotImplementedError()
+
+
+class NullBackend(RenderBackend):
+    """Backend that draws nothing, it only keeps track of what it was asked to draw. Used to run
+    pets without a display, ie for tests and benchmarks
+    """
+
+    geometry_calls: int
+    """How many times the geometry was applied"""
+    frame_calls: int
+    """How many times a frame was applied"""
+
+    def __init__(self, resolution: Dict[str, int]):
+        """
+        Args:
+            resolution (Dict[str, int]): must have "width" and "height" as keys
+        """
+        super().__init__(resolution)
+        self.geometry = None
+        self.frame = None
+        self.geometry_calls = 0
+        self.frame_calls = 0
+
+    def apply_geometry(self, width: int, height: int, x: int, y: int):
+        self.geometry = (width, height, x, y)
+        self.geometry_calls += 1
+
+    def apply_frame(self, frame: Any):
+        self.frame = frame
+        self.frame_calls += 1
+
+    def __repr__(self):
+        return f"<NullBackend: width {self.resolution['width']}px and height {self.resolution['height']}px>"
@@ -0,0 +1,336 @@
+import math
+import queue
+import time
+from typing import Any, Callable, List
+from src import logger
+from src.tracing import tracer
+from .metrics import Metrics
+from .physics import PhysicsWorld
+from .simple_pet import SimplePet
+
+
+class Scheduler:
+    """Drives the update loop of pets. Physics and animation time advance in fixed steps of
+    physics_step ms (using an accumulator of the real time that has passed), while drawing happens
+    once per loop, which runs as often as the fastest animation being played needs it to.
+
+    As the steps are a fixed size movement does not depend on how quickly tkinter gets around to
+    calling the loop, and if the loop falls too far behind the time that cannot be caught up on is
+    dropped instead of making the pets fast forward.
+
+    The loop runs on a tkinter window's event loop, but `Scheduler.tick` can be called directly to
+    drive pets without tkinter. Other threads hand work to the loop with `Scheduler.call_soon`, as
+    tkinter (and the pets) may only be touched from the thread running the loop. While paused (ie
+    the pets are hidden) the pets are not updated at all, the loop only wakes up every
+    PAUSED_INTERVAL ms to run those calls.
+
+    In power saving mode the loop does not wake up at the frame_timer of the animations, but only
+    when a pet will look different: its next distinct frame, the end of its animation, or every
+    update while it moves (see `SimplePet.next_change`). A sleeping pet then costs one wakeup per
+    frame instead of ten. With a cpu_budget the loop is kept from spending more than that part of the
+    time ticking, by updating the static pets less often first and then slowing down all of them.
+    """
+
+    PAUSED_INTERVAL = 250
+    """ms between checks for calls from other threads while paused"""
+    MAX_SLEEP = 1000
+    """Longest the loop sleeps for, calls from other threads wait at most this long"""
+    THROTTLED_INTERVAL = 1000
+    """Shortest ms between updates that static pets ask for while the loop is over its cpu budget"""
+    TICK_COST_SMOOTHING = 0.2
+    """Weight of the latest loop in the running average of how long a loop takes"""
+
+    window: Any
+    """window whose event loop runs the scheduler (ie a tk.Tk), None when driven by hand"""
+    pets: List[SimplePet]
+    physics_step: float
+    """ms of time simulated by every physics step"""
+    max_steps: int
+    """Most physics steps to run in one loop, time past this is dropped"""
+    skipped_steps: int
+    """How many physics steps were dropped because the loop fell behind"""
+    physics: PhysicsWorld
+    """Moves all of the pets at once when batch_physics is on, None otherwise"""
+    metrics: Metrics
+    """Collects the timings of the loop, None to not collect them"""
+    report_path: str
+    """json file the metrics are written to every report_interval seconds, None to not write them"""
+    report_interval: float
+    power_saving: bool
+    """Only wake up for the next visible change of the pets, see the class docstring"""
+    cpu_budget: float
+    """Most part (0 to 1) of the time the loop may spend ticking, None if there is no limit"""
+    throttled: bool
+    """Whether or not the pets were slowed down to stay within the cpu_budget"""
+
+    def __init__(
+        self,
+        window: Any = None,
+        physics_step: float = 10,
+        max_catch_up: float = 250,
+        batch_physics: bool = False,
+        metrics: Metrics = None,
+        report_path: str = None,
+        report_interval: float = 60,
+        power_saving: bool = False,
+        cpu_budget: float = None,
+    ):
+        """
+        Args:
+            window (tk.Tk, optional): window whose event loop runs the scheduler. Defaults to None, only
+            `Scheduler.tick` can be used then
+            physics_step (float, optional): ms of time simulated by every physics step. Defaults to 10.
+            max_catch_up (float, optional): most ms of time to simulate in one loop, if the loop falls behind
+            by more than this the extra time is dropped. Defaults to 250.
+            batch_physics (bool, optional): Move all of the pets at once with a `PhysicsWorld`, which is much faster
+            for large amounts of pets. Needs numpy, if it is not installed pets move themselves. Defaults to False.
+            metrics (Metrics, optional): collects the timings of the loop and of the pets' windows. Defaults to None.
+            report_path (str, optional): json file to write `Scheduler.report` to while the loop runs, needs
+            metrics. Defaults to None, no file.
+            report_interval (float, optional): seconds between writes of the report. Defaults to 60.
+            power_saving (bool, optional): only wake up when a pet will look different, instead of at the
+            frame_timer of every animation. Defaults to False.
+            cpu_budget (float, optional): most part (0 to 1) of the time the loop may spend ticking, ie 0.05
+            for 5% of a core. Defaults to None, no limit.
+        """
+        self.window = window
+        self.pets = []
+        self.physics_step = physics_step
+        self.max_steps = max(1, int(max_catch_up // physics_step))
+        self.skipped_steps = 0
+        self.physics = None
+        self.batch_physics = batch_physics
+        if batch_physics and not PhysicsWorld.available():
+            logger.warning("numpy is not installed, pets will not use batched physics")
+            self.batch_physics = False
+        self.metrics = metrics
+        self.report_path = report_path
+        self.report_interval = report_interval
+        self.power_saving = power_saving
+        self.cpu_budget = cpu_budget
+        self.throttled = False
+        self._tick_cost = 0.0
+        self._after = None
+        self._accumulator = 0.0
+        self._last_time = None
+        self._requested = None
+        self._next_report = None
+        self._running = False
+        self._paused = False
+        self._calls: "queue.SimpleQueue[Callable[[], Any]]" = queue.SimpleQueue()
+
+    def add_pet(self, pet: SimplePet):
+        """Start updating and drawing a pet
+
+        Args:
+            pet (SimplePet): pet to drive
+        """
+        self.pets.append(pet)
+        if self.batch_physics and hasattr(pet, "attach_physics"):
+            if self.physics is None:
+                self.physics = PhysicsWorld(pet.canvas.resolution)
+            pet.attach_physics(self.physics)
+        if self.metrics is not None:
+            pet.canvas.metrics = self.metrics
+
+    def start(self):
+        """Start the loop, it runs for as long as the window's main loop does"""
+        if self._running:
+            return
+        self._running = True
+        self._last_time = time.perf_counter()
+        self._accumulator = 0.0
+        self._requested = None
+        if self.report_interval is not None:
+            self._next_report = self._last_time + self.report_interval
+        self._after = self.window.after(0, self._loop)
+
+    def wake(self):
+        """Run the loop now instead of when it planned to, ie when the user grabs a pet while the loop
+        sleeps in power saving mode. Must be called on the scheduler's thread"""
+        if not self._running or self._paused or self._after is None:
+            return
+        self.window.after_cancel(self._after)
+        # The loop is early on purpose, that is not jitter
+        self._requested = None
+        self._after = self.window.after(0, self._loop)
+
+    def stop(self):
+        """Stop the loop after its current iteration"""
+        self._running = False
+
+    @property
+    def paused(self) -> bool:
+        """Whether or not the pets are paused, see `Scheduler.pause`"""
+        return self._paused
+
+    def pause(self):
+        """Stop updating and drawing the pets until `Scheduler.resume`. Calls from other threads still run"""
+        self._paused = True
+
+    def resume(self):
+        """Continue updating the pets from where they were paused, the time in between is skipped"""
+        if not self._paused:
+            return
+        self._paused = False
+        self._last_time = time.perf_counter()
+        self._accumulator = 0.0
+        self._requested = None
+
+    def call_soon(self, callback: Callable[[], Any]):
+        """Run a function on the scheduler's thread before the next tick. Safe to call from any thread
+
+        Args:
+            callback (Callable[[], Any]): function to run, it gets no arguments
+        """
+        self._calls.put(callback)
+
+    def run_calls(self):
+        """Run the functions handed to `Scheduler.call_soon`, an exception in one of them is logged
+        instead of stopping the loop"""
+        while True:
+            try:
+                callback = self._calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback()
+            except Exception:
+                logger.exception(f"Scheduled call {callback} failed")
+
+    def tick(self, elapsed: float):
+        """Run the functions handed to `Scheduler.call_soon`, then run the physics steps for elapsed ms
+        of time and draw the pets
+
+        Args:
+            elapsed (float): ms of real time that passed since the last tick
+        """
+        start = time.perf_counter() if self.metrics is not None else None
+        self.run_calls()
+        self._accumulator += elapsed
+        steps = int(self._accumulator // self.physics_step)
+        max_steps = self.max_steps
+        if self._requested is not None:
+            # The loop may have meant to sleep for longer than max_catch_up, only drop the time it is late by
+            max_steps += int(self._requested // self.physics_step)
+        if steps > max_steps:
+            # Too far behind to catch up, skip the simulation forward instead
+            self.skipped_steps += steps - max_steps
+            logger.debug(f"Scheduler fell behind, skipping {steps - max_steps} steps")
+            self._accumulator -= (steps - max_steps) * self.physics_step
+            steps = max_steps
+        physics = self.physics
+        for _ in range(steps):
+            if physics is not None:
+                physics.step(self.physics_step)
+            for pet in self.pets:
+                pet.update(self.physics_step)
+            self._accumulator -= self.physics_step
+
+        if physics is not None:
+            physics.sync()
+        for pet in self.pets:
+            pet.render()
+        if tracer.enabled:
+            tracer.record_tick(elapsed, steps, self.pets)
+        if start is not None:
+            self.metrics.ticks.record((time.perf_counter() - start) * 1000)
+
+    def report(self) -> dict:
+        """The metrics collected so far, with the load times of the pets' animations
+
+        Returns:
+            dict: see `Metrics.report`, plus the physics steps that were skipped
+        """
+        report = self.metrics.report(self.pets)
+        report["skipped_steps"] = self.skipped_steps
+        return report
+
+    def write_report(self):
+        """Write `Scheduler.report` to the report_path, a failed write is logged instead of raised"""
+        try:
+            Metrics.write_report(self.report_path, self.report())
+        except OSError as e:
+            logger.error(f"Could not write the metrics to {self.report_path}: {e}")
+
+    def next_interval(self) -> float:
+        """ms until the pets need to be updated again, which is when the pet that needs it the soonest
+        (ie the one playing the fastest animation) expects its next update. In power saving mode that is
+        the next visible change of a pet instead. When the loop would go over its cpu_budget the static
+        pets are updated at most every THROTTLED_INTERVAL ms, and if that is not enough the interval is
+        stretched until the loop fits in the budget
+
+        Returns:
+            float
+        """
+        if self.power_saving:
+            needs = [(pet.next_change(), pet) for pet in self.pets]
+            interval = min((need for need, _ in needs), default=Scheduler.MAX_SLEEP)
+        else:
+            needs = [(pet.update_interval(), pet) for pet in self.pets]
+            interval = min((need for need, _ in needs), default=100)
+
+        budget = self.cpu_budget
+        self.throttled = budget is not None and self._tick_cost > budget * interval
+        if self.throttled:
+            interval = min(
+                (
+                    (
+                        max(need, Scheduler.THROTTLED_INTERVAL)
+                        if pet.is_static()
+                        else need
+                    )
+                    for need, pet in needs
+                ),
+                default=interval,
+            )
+            interval = max(interval, self._tick_cost / budget)
+        interval = min(interval, Scheduler.MAX_SLEEP)
+
+        if self.power_saving:
+            # Pets only change in whole physics steps, wake up for the step that makes the change
+            steps = max(1, math.ceil(interval / self.physics_step))
+            interval = steps * self.physics_step - self._accumulator
+        return interval
+
+    def _loop(self):
+        """Tick with the time that has passed since the last loop and schedule the next loop"""
+        if not self._running:
+            return
+        if self.metrics is not None:
+            self.metrics.wakeups += 1
+        if self._paused:
+            self.run_calls()
+            # A call may have stopped the scheduler and destroyed its window, ie exit from the tray
+            if not self._running:
+                return
+            if self._paused:
+                self._after = self.window.after(Scheduler.PAUSED_INTERVAL, self._loop)
+                return
+        now = time.perf_counter()
+        elapsed = (now - self._last_time) * 1000
+        if tracer.enabled and elapsed > tracer.stall_threshold:
+            tracer.dump(f"the loop stalled for {elapsed:.0f}ms")
+        if self.metrics is not None and self._requested is not None:
+            self.metrics.record_interval(self._requested, elapsed)
+        try:
+            self.tick(elapsed)
+        except Exception:
+            if tracer.enabled:
+                tracer.dump("a tick failed")
+            raise
+        self._last_time = now
+        if self.report_path is not None and now >= self._next_report:
+            self._next_report = now + self.report_interval
+            self.write_report()
+
+        # Come back for the next update, minus the time this loop took. Rounded up, as coming back a
+        # fraction of a ms early means waking up again right after for the physics step it missed
+        spent = (time.perf_counter() - now) * 1000
+        self._tick_cost += (spent - self._tick_cost) * Scheduler.TICK_COST_SMOOTHING
+        interval = self.next_interval()
+        if self.metrics is not None and self.throttled:
+            self.metrics.throttled += 1
+        spent = (time.perf_counter() - now) * 1000
+        self._after = self.window.after(max(1, math.ceil(interval - spent)), self._loop)
+        self._requested = interval
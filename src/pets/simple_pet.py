@@ -1,15 +1,14 @@
-import tkinter as tk
-
+from typing import Any
 from ..animation import Animation, AnimationStates, Animator
-from ..window_utils import Canvas
-from src import logger
+from .render_backend import RenderBackend
 
 
 class SimplePet:
-    x: int
-    y: int
+    x: float
+    y: float
 
-    canvas: Canvas
+    canvas: RenderBackend
+    """What the pet draws itself with, ie the tkinter window"""
     animator: Animator
 
     def __init__(self, x, y, canvas, animator):
@@ -18,9 +17,47 @@ class SimplePet:
         self.canvas = canvas
         self.animator = animator
 
-    def update(self):
-        """progress to next frame of animation"""
-        self.progress_animation()
+    def update(self, elapsed: float = None):
+        """progress the animation
+
+        Args:
+            elapsed (float, optional): ms of time to progress by. Defaults to None, the frame_timer of the
+            current animation
+        """
+        self.progress_animation(elapsed)
+
+    def render(self):
+        """Move the window to the pet and show its current frame"""
+        self.set_geometry()
+        self.draw_frame()
+
+    def update_interval(self) -> float:
+        """ms until the pet needs to be updated again
+
+        Returns:
+            float: the frame_timer of the current animation
+        """
+        return self.get_current_animation().frame_timer
+
+    def is_static(self) -> bool:
+        """Whether or not the pet stays where it is, so only its frames change
+
+        Returns:
+            bool: always True, a SimplePet does not move
+        """
+        return True
+
+    def next_change(self) -> float:
+        """ms until the pet looks different, which is when its next distinct frame is shown or its
+        animation ends. A pet that moves changes all the time, so it also needs every `update_interval`
+
+        Returns:
+            float
+        """
+        change = self.get_current_animation().next_change(self.animator.elapsed)
+        if not self.is_static():
+            return min(change, self.update_interval())
+        return change
 
     def get_current_animation(self) -> Animation:
         """Returns the current animation of the Pet instance
@@ -30,11 +67,11 @@ class SimplePet:
         """
         return self.animator.animations[self.animator.state]
 
-    def get_curent_animation_frame(self) -> tk.PhotoImage:
+    def get_curent_animation_frame(self) -> Any:
         """get and return the current animation
 
         Returns:
-            tk.PhotoImage: image of animation to draw
+            Any: image of animation to draw, ie a tk.PhotoImage
         """
         animation = self.get_current_animation()
         return animation.frames[self.animator.frame_number]
@@ -54,32 +91,30 @@ class SimplePet:
         return changed
 
     # making gif work
-    def progress_animation(self):
-        """Move the animation forward one frame. If the animation has finished (ie current frame is
-        the last frame) then try to progress to the next animation
+    def progress_animation(self, elapsed: float = None):
+        """Move the animation forward in time, showing whichever frame is visible at that time.
+        If the animation has finished then try to progress to the next animation
+
+        Args:
+            elapsed (float, optional): ms of time to progress by. Defaults to None, the frame_timer of the
+            current animation
         """
         animation = self.get_current_animation()
-        if self.animator.frame_number < len(animation.frames) - 1:
-            logger.debug("frame repeating")
-            self.animator.frame_number += 1
+        self.animator.elapsed += (
+            elapsed if elapsed is not None else animation.frame_timer
+        )
+        if self.animator.elapsed < animation.duration:
+            self.animator.frame_number = animation.frame_index_at(self.animator.elapsed)
         else:
-            logger.debug("getting next state")
             self.animator.frame_number = 0
+            self.animator.elapsed = 0
             self.set_animation_state(animation.next(self.animator))
 
-        logger.debug(f"{self.animator.state.__repr__()}, {self.animator.frame_number}")
+    def draw_frame(self):
+        """Show the current frame of the animation, the canvas skips it if the frame is already shown"""
+        self.canvas.show_frame(self.get_curent_animation_frame())
 
     def set_geometry(self):
         """Update the window position and scale to match that of the pet instance's location and size"""
         size = self.animator.animations[self.animator.state].target_resolution
-        self.canvas.window.geometry(
-            str(size[0]) + "x" + str(size[1]) + "+" + str(self.x) + "+" + str(self.y)
-        )
-
-    def handle_event(self):
-        """Part of animation loop, after delay between frames in animation
-        proceed to begin logic of drawing next frame
-        """
-        self.canvas.window.after(
-            self.animator.animations[self.animator.state].frame_timer, self.on_tick
-        )
+        self.canvas.set_geometry(size[0], size[1], int(self.x), int(self.y))
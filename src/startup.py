@@ -0,0 +1,48 @@
+import time
+from typing import List, Tuple
+
+
+class StartupReport:
+    """Times the phases of starting the program, up to the first frame of the pets being shown"""
+
+    started: float
+    """time.perf_counter() of when the program started"""
+    phases: List[Tuple[str, float]]
+    """Name and ms taken of every phase, in order"""
+
+    def __init__(self, started: float = None):
+        """
+        Args:
+            started (float, optional): time.perf_counter() of when the program started. Defaults to None, now.
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = []
+        self._last = self.started
+
+    def mark(self, phase: str):
+        """End a phase, it took the time since the previous phase ended
+
+        Args:
+            phase (str): what was done in the phase, ie "config"
+        """
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def total(self) -> float:
+        """ms from the start of the program to the end of the last phase
+
+        Returns:
+            float
+        """
+        return (self._last - self.started) * 1000
+
+    def __str__(self):
+        width = max((len(phase) for phase, _ in self.phases), default=0)
+        total = self.total()
+        lines = [
+            f"{phase:<{width}}  {ms:8.1f}ms  {ms / total if total > 0 else 0:6.1%}"
+            for phase, ms in self.phases
+        ]
+        lines.append(f"{'total':<{width}}  {total:8.1f}ms")
+        return "\n".join(lines)
@@ -0,0 +1,152 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from src import logger
+
+trace_logger = logger.getChild("trace")
+"""Logger the traced events are written to, at DEBUG level"""
+
+
+@dataclass(frozen=True)
+class TickRecord:
+    """What the pets looked like at the end of one tick of the scheduler"""
+
+    time: float
+    """time.time() at the end of the tick"""
+    elapsed: float
+    """ms of real time the tick covered"""
+    steps: int
+    """physics steps that were run"""
+    pets: Tuple[Tuple[str, int, int, int], ...]
+    """state name, frame number, x and y of every pet"""
+    events: Tuple[Tuple[str, Dict[str, Any]], ...]
+    """events that were traced during the tick, with their fields"""
+
+    def __str__(self):
+        pets = " ".join(f"{s}#{f}@({x},{y})" for s, f, x, y in self.pets)
+        events = "".join(f"\n    {name} {fields}" for name, fields in self.events)
+        return f"{time.strftime('%H:%M:%S', time.localtime(self.time))}.{int(self.time * 1000) % 1000:03d} \
++{self.elapsed:.1f}ms {self.steps} steps: {pets}{events}"
+
+
+class Tracer:
+    """Structured tracing of the tick loop that costs nothing when it is off.
+
+    Code on the hot path only checks `Tracer.enabled` (a plain attribute) and builds nothing unless
+    it is True, ie:
+
+        if tracer.enabled:
+            tracer.trace("state", pet=id(self), state=state.name)
+
+    Tracing is on while the trace logger ("src.trace") is enabled for DEBUG, in which case events are
+    logged, or while ticks are being recorded. Recording keeps the last n ticks of every pet's state
+    and the events traced during them in a ring buffer, which is written to the log when the loop
+    stalls or a tick fails, so freezes can be looked into after they happened.
+    """
+
+    enabled: bool
+    """Whether or not anything is done with traced events"""
+    stall_threshold: float
+    """Ticks that cover more than this many ms of time count as a stall of the loop"""
+
+    def __init__(self, stall_threshold: float = 1000):
+        """
+        Args:
+            stall_threshold (float, optional): ms a tick has to cover to count as a stall. Defaults to 1000.
+        """
+        self.stall_threshold = stall_threshold
+        self.enabled = False
+        self._logging = False
+        self._ticks: Optional[Deque[TickRecord]] = None
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+
+    def configure(self, ticks: int = None, level: int = None):
+        """Change what is traced. Call this again after changing the level of the trace logger by hand
+
+        Args:
+            ticks (int, optional): how many ticks to record, 0 stops recording. Defaults to None, unchanged.
+            level (int, optional): level of the trace logger, ie logging.DEBUG to log every event.
+            Defaults to None, unchanged.
+        """
+        if level is not None:
+            trace_logger.setLevel(level)
+        if ticks is not None:
+            self._ticks = deque(self._ticks or (), maxlen=ticks) if ticks > 0 else None
+            self._events = []
+        self._logging = trace_logger.isEnabledFor(logging.DEBUG)
+        self.enabled = self._logging or self._ticks is not None
+
+    @property
+    def recording(self) -> bool:
+        """Whether or not ticks are being recorded"""
+        return self._ticks is not None
+
+    def trace(self, event: str, **fields: Any):
+        """Trace an event. Only call this when `Tracer.enabled` is True
+
+        Args:
+            event (str): what happened, ie "state"
+            **fields (Any): details of the event
+        """
+        if self._ticks is not None:
+            self._events.append((event, fields))
+        if self._logging:
+            # Formatted by the logging handler, only if the record is actually written
+            trace_logger.debug("%s %s", event, fields)
+
+    def record_tick(self, elapsed: float, steps: int, pets: list):
+        """Record the end of a tick. Does nothing unless recording
+
+        Args:
+            elapsed (float): ms of real time the tick covered
+            steps (int): physics steps that were run
+            pets (list): the pets that were updated, see `SimplePet`
+        """
+        if self._ticks is None:
+            return
+        self._ticks.append(
+            TickRecord(
+                time.time(),
+                elapsed,
+                steps,
+                tuple(
+                    (
+                        pet.animator.state.name,
+                        pet.animator.frame_number,
+                        int(pet.x),
+                        int(pet.y),
+                    )
+                    for pet in pets
+                ),
+                tuple(self._events),
+            )
+        )
+        self._events = []
+
+    def recent_ticks(self) -> List[TickRecord]:
+        """The recorded ticks, oldest first
+
+        Returns:
+            List[TickRecord]
+        """
+        return list(self._ticks or ())
+
+    def dump(self, reason: str):
+        """Write the recorded ticks to the log
+
+        Args:
+            reason (str): why they are written, ie "the loop stalled for 2000ms"
+        """
+        ticks = self.recent_ticks()
+        if len(ticks) == 0:
+            return
+        logger.error(
+            f"Last {len(ticks)} ticks before {reason}:\n  "
+            + "\n  ".join(str(tick) for tick in ticks)
+        )
+
+
+tracer = Tracer()
+"""The tracer of the tick loop, shared by everything that traces"""
@@ -1,3 +1,4 @@
 from .configure_window import configure_window
 from .window_visability import show_window
 from .canvas import Canvas
+from .tray import Tray
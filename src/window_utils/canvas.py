@@ -1,25 +1,37 @@
 import tkinter as tk
+from src.pets.render_backend import RenderBackend
 
 
-class Canvas:
+class Canvas(RenderBackend):
     """Represents information on the tkinter window and label as well as information of the
     desktop's width and height, aka resolution
     """
 
-    window: tk.Tk
+    window: tk.Wm
     label: tk.Label
     resolution: any
 
     def __init__(self, window, label, resolution):
         """
         Args:
-            window (tkinter.Tk)
+            window (tkinter.Tk | tkinter.Toplevel): the window of the pet
             label (tkinter.Label)
             resolution (Dict[str, int]): must have "width" and "height" as keys
         """
+        super().__init__(resolution)
         self.window = window
         self.label = label
-        self.resolution = resolution
+
+    def apply_geometry(self, width: int, height: int, x: int, y: int):
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+
+    def apply_frame(self, frame: tk.PhotoImage):
+        self.label.configure(image=frame)
+
+    def set_background(self, color: str):
+        self.window.config(highlightbackground=color)
+        self.label.configure(bg=color)
+        self.window.wm_attributes("-transparentcolor", color)
 
     def __repr__(self):
         return f"<Canvas:c width {self.resolution['width']}px and height {self.resolution['height']}px>"
@@ -1,12 +1,17 @@
 import tkinter as tk
 import pathlib
 import os
-from .window_visability import show_in_tray, show_window, hide_window
+from .window_visability import hide_window
 from .canvas import Canvas
 
 
 def configure_window(
-    window: tk.Tk, topmost=True, bg_color="#000", pet_name="Pet", resolution=(100, 100)
+    window: tk.Wm,
+    topmost=True,
+    bg_color="#000",
+    pet_name="Pet",
+    resolution=(100, 100),
+    on_close=None,
 ):
     # We pick a transparent color here for the background
     # ! This should be different for mac as mac os has alpha channel
@@ -29,7 +34,8 @@ def configure_window(
     # Remove minimize/close buttuns and titlebar, but
     # keep in the taskbar
     window.overrideredirect(True)
-    window.protocol("WM_DELETE_WINDOW", lambda: hide_window(window))
+    # Closing only hides the window, or whatever on_close does (ie hide the pets in the tray)
+    window.protocol("WM_DELETE_WINDOW", on_close or (lambda: hide_window(window)))
 
     canvas = Canvas(window, label, resolution)
     return canvas
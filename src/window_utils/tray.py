@@ -0,0 +1,95 @@
+import os
+import pathlib
+import threading
+from typing import Any
+from src import logger
+from src.pets import Scheduler
+from .window_visability import hide_window, show_window
+
+
+class Tray:
+    """Puts the pets away into the system tray and brings them back.
+
+    While the pets are hidden their windows are withdrawn, the scheduler is paused so the pets are
+    not updated at all, and a tray icon is shown. The icon (pystray) runs its own event loop on a
+    background thread, so tkinter keeps running its loop on the main thread. The menu of the icon
+    never touches tkinter itself, it hands its commands to the scheduler with `Scheduler.call_soon`,
+    which runs them on the tkinter thread, even while paused.
+    """
+
+    scheduler: Scheduler
+    """Scheduler driving the pets that are hidden and shown"""
+    title: str
+    """Name shown when hovering over the icon"""
+    icon_path: str
+
+    def __init__(
+        self, scheduler: Scheduler, title: str = "DesktopPet", icon_path: str = None
+    ):
+        """
+        Args:
+            scheduler (Scheduler): scheduler driving the pets
+            title (str, optional): Name shown when hovering over the icon. Defaults to "DesktopPet".
+            icon_path (str, optional): image of the icon. Defaults to None, the icon.ico in the current working directory.
+        """
+        self.scheduler = scheduler
+        self.title = title
+        self.icon_path = icon_path or os.path.join(pathlib.Path().resolve(), "icon.ico")
+        self._icon: Any = None
+        self._thread: threading.Thread = None
+
+    @property
+    def hidden(self) -> bool:
+        """Whether or not the pets are in the tray"""
+        return self._icon is not None
+
+    def hide(self):
+        """Hide every pet and show the tray icon. Must be called on the tkinter thread"""
+        if self.hidden:
+            return
+        for pet in self.scheduler.pets:
+            hide_window(pet.canvas.window)
+        self.scheduler.pause()
+        self._icon = self._create_icon()
+        self._thread = threading.Thread(target=self._icon.run, name="Tray", daemon=True)
+        self._thread.start()
+        logger.info("Hid the pets in the tray")
+
+    def show(self):
+        """Remove the tray icon and show every pet again. Must be called on the tkinter thread"""
+        if not self.hidden:
+            return
+        self._stop_icon()
+        for pet in self.scheduler.pets:
+            show_window(pet.canvas.window)
+            # The window was changed behind the canvas' back
+            pet.canvas.invalidate()
+        self.scheduler.resume()
+        logger.info("Showing the pets again")
+
+    def exit(self):
+        """Remove the tray icon and close the program. Must be called on the tkinter thread"""
+        self._stop_icon()
+        self.scheduler.stop()
+        self.scheduler.window.destroy()
+
+    def _stop_icon(self):
+        if self._icon is not None:
+            self._icon.stop()
+            self._icon = None
+            self._thread = None
+
+    def _create_icon(self):
+        # The tray is only needed once the pets are hidden, so pystray is not imported when the program starts
+        import pystray
+        from PIL import Image
+
+        call_soon = self.scheduler.call_soon
+        icon = pystray.Icon(self.title)
+        icon.menu = pystray.Menu(
+            pystray.MenuItem("exit", lambda: call_soon(self.exit)),
+            pystray.MenuItem("show", lambda: call_soon(self.show), default=True),
+        )
+        icon.icon = Image.open(self.icon_path)
+        icon.title = self.title
+        return icon